@@ -3,22 +3,29 @@ import dash
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
-from dash.dependencies import Input, Output, State
-import dash_table as dt
+from dash.dependencies import ALL, MATCH, ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 
 # OTHER IMPORTS
 import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objs as go
-import time
-from itertools import chain
+import os
+from contextlib import nullcontext
+from functools import lru_cache
 
 # LOCAL IMPORTS
-from utils import make_group, generate_popovers, generate_qm
-from utils import make_card_repartition, make_row, millify, generate_form_naissances
-from utils import get_pitch, generate_item
-from model import process_values
+from utils import make_group, generate_popovers, make_question_mark
+from utils import make_card_repartition, generate_form_naissances
+from utils import get_pitch, generate_item, proportions_mere_bebe
+from model import INDICES_VARIABLES, SECTEURS, compile_model, evaluer, signature_modele
+from model import tableaux
+from cache import CacheEnCouches, LRUCache, SQLiteCache, cle_sliders
+from territoires import charger_territoires, naissances_par_id, options_dropdown
+from territoires import rechercher
+from sensibilite import tornado
+from metriques import DUREE_ETAPES, Jauge, instrumenter
+from profilage import activer_par_requete, profile
+from presets import TablePresets
 from table_mod import generate_table_from_df
 
 
@@ -27,6 +34,11 @@ external_stylesheets = [dbc.themes.BOOTSTRAP]
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 server = app.server
 
+# durée et taille de chaque callback, exposées avec les autres métriques sur /metrics
+instrumenter(server)
+# profilage à la demande, si PSYTHON_PROFIL=requete (voir profilage.py)
+activer_par_requete(server)
+
 # CSS SETTINGS
 eq_width = {"width": "25%", "text-align": "center", "font-weight": "bold"}
 tt = {"always_visible": False, "placement": "topLeft"}
@@ -36,80 +48,151 @@ global df_variables
 col_types = {"maxi": float, "mini": int, "val": float, "step": float}
 df_variables = pd.read_csv("bdd_variables.csv", dtype=col_types)
 nb_variables_total = df_variables.shape[0]
+positions_modele = compile_model(df_variables)
+# slider du revenu horaire des femmes, que le choix du territoire met à son salaire
+INDEX_REVENU = int(positions_modele[INDICES_VARIABLES["revenu_horaire_femme"]])
+SLIDER_REVENU = {"type": "slider", "index": INDEX_REVENU}
+
+# PRESETS central/haut (val/maxi), calculés au démarrage ou relus depuis le
+# fichier PSYTHON_PRESETS s'il est défini
+table_presets = TablePresets(
+    df_variables, positions_modele, os.environ.get("PSYTHON_PRESETS")
+)
 
+# CACHE DES RESULTATS PAR VECTEUR DE SLIDERS
+# Si PSYTHON_CACHE désigne une base SQLite, les résultats sont aussi partagés entre
+# workers, et avec les CLI batch.py et sensibilite.py lancées avec --cache
+CACHE_MAXSIZE = 256
+CACHE_PARTAGE_TTL = 7 * 24 * 3600
+if os.environ.get("PSYTHON_CACHE"):
+    cache_resultats = CacheEnCouches(
+        LRUCache(maxsize=CACHE_MAXSIZE),
+        SQLiteCache(
+            os.environ["PSYTHON_CACHE"],
+            ttl=CACHE_PARTAGE_TTL,
+            version=signature_modele(positions_modele),
+        ),
+    )
+else:
+    cache_resultats = LRUCache(maxsize=CACHE_MAXSIZE)
+cache_tornado = LRUCache(maxsize=CACHE_MAXSIZE)
+
+for nom_cache, cache in [("resultats", cache_resultats), ("tornado", cache_tornado)]:
+    Jauge(
+        f"psython_cache_{nom_cache}_hits_total",
+        f"Hits du cache {nom_cache}",
+        lambda cache=cache: cache.hits,
+        "counter",
+    )
+    Jauge(
+        f"psython_cache_{nom_cache}_misses_total",
+        f"Misses du cache {nom_cache}",
+        lambda cache=cache: cache.misses,
+        "counter",
+    )
+    Jauge(
+        f"psython_cache_{nom_cache}_entrees",
+        f"Entrées du cache {nom_cache}",
+        lambda cache=cache: len(cache),
+    )
 
-# DEPRESSION
-items_depression_mere = generate_item(df_variables, "depression_mere")
-items_depression_bebe = generate_item(df_variables, "depression_bebe")
-
-
-# ANXIETE
-items_anxiete_mere = generate_item(df_variables, "anxiete_mere")
-items_anxiete_bebe = generate_item(df_variables, "anxiete_bebe")
-
-
-# PSYCHOSE
-items_psychose_mere = generate_item(df_variables, "psychose_mere")
-items_psychose_bebe = generate_item(df_variables, "psychose_bebe")
+# DIAGRAMME EN TORNADE : variables affichées, par ampleur d'effet décroissante
+TORNADO_N_BARRES = 20
 
 
-# MEDICAL ET ECONOMIQUE
-items_economique = generate_item(df_variables, "economique")
-items_medical = generate_item(df_variables, "medical")
+# MISE EN PAGE
+# app.layout est une fonction, appelée par Dash au chargement de la page : l'import
+# (et donc le démarrage d'un worker) ne construit plus aucun composant. Chaque
+# fragment est mémoïsé et n'est construit qu'une fois, au premier chargement
 
 
-tabs_variables = dbc.Tabs(
-    [
-        dbc.Tab(
-            make_group("Variables médicales", items_medical, "Variables-Médicales"),
-            label="Variables médicales",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            make_group(
-                "Variables économiques", items_economique, "Variables-Economiques"
-            ),
-            label="Variables économiques",
-            tab_style=eq_width,
-        ),
-    ],
-)
+@lru_cache(maxsize=None)
+def tabs_variables():
+    # MEDICAL ET ECONOMIQUE
+    items_economique = generate_item(df_variables, "economique")
+    items_medical = generate_item(df_variables, "medical")
 
-tabs_maladies = dbc.Tabs(
-    [
-        dbc.Tab(
-            [
+    return dbc.Tabs(
+        [
+            dbc.Tab(
                 make_group(
-                    "Coûts pour la mère", items_depression_mere, "Dépression-Mère"
+                    "Variables médicales", items_medical, "Variables-Médicales"
                 ),
-                html.Hr(),
+                label="Variables médicales",
+                tab_style=eq_width,
+            ),
+            dbc.Tab(
                 make_group(
-                    "Coûts pour le bébé", items_depression_bebe, "Dépression-Bébé"
+                    "Variables économiques", items_economique, "Variables-Economiques"
                 ),
-            ],
-            label="Dépression de la mère",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            [
-                make_group("Coûts pour la mère", items_anxiete_mere, "Anxiété-Mère"),
-                html.Hr(),
-                make_group("Coûts pour le bébé", items_anxiete_bebe, "Anxiété-Bébé"),
-            ],
-            label="Anxiété de la mère",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            [
-                make_group("Coûts pour la mère", items_psychose_mere, "Psychose-Mère"),
-                html.Hr(),
-                make_group("Coûts pour le bébé", items_psychose_bebe, "Psychose-Bébé"),
-            ],
-            label="Psychose de la mère",
-            tab_style=eq_width,
-        ),
-    ],
-)
+                label="Variables économiques",
+                tab_style=eq_width,
+            ),
+        ],
+    )
+
+
+@lru_cache(maxsize=None)
+def tabs_maladies():
+    # DEPRESSION
+    items_depression_mere = generate_item(df_variables, "depression_mere")
+    items_depression_bebe = generate_item(df_variables, "depression_bebe")
+
+    # ANXIETE
+    items_anxiete_mere = generate_item(df_variables, "anxiete_mere")
+    items_anxiete_bebe = generate_item(df_variables, "anxiete_bebe")
+
+    # PSYCHOSE
+    items_psychose_mere = generate_item(df_variables, "psychose_mere")
+    items_psychose_bebe = generate_item(df_variables, "psychose_bebe")
+
+    return dbc.Tabs(
+        [
+            dbc.Tab(
+                [
+                    make_group(
+                        "Coûts pour la mère",
+                        items_depression_mere,
+                        "Dépression-Mère",
+                    ),
+                    html.Hr(),
+                    make_group(
+                        "Coûts pour le bébé",
+                        items_depression_bebe,
+                        "Dépression-Bébé",
+                    ),
+                ],
+                label="Dépression de la mère",
+                tab_style=eq_width,
+            ),
+            dbc.Tab(
+                [
+                    make_group(
+                        "Coûts pour la mère", items_anxiete_mere, "Anxiété-Mère"
+                    ),
+                    html.Hr(),
+                    make_group(
+                        "Coûts pour le bébé", items_anxiete_bebe, "Anxiété-Bébé"
+                    ),
+                ],
+                label="Anxiété de la mère",
+                tab_style=eq_width,
+            ),
+            dbc.Tab(
+                [
+                    make_group(
+                        "Coûts pour la mère", items_psychose_mere, "Psychose-Mère"
+                    ),
+                    html.Hr(),
+                    make_group(
+                        "Coûts pour le bébé", items_psychose_bebe, "Psychose-Bébé"
+                    ),
+                ],
+                label="Psychose de la mère",
+                tab_style=eq_width,
+            ),
+        ],
+    )
 
 
 lien_article_site = "http://alliance-psyperinat.org/2020/04/28/rapport-da-bauer-lse/"
@@ -123,8 +206,6 @@ lien_govuk = (
 )
 
 
-pitch = get_pitch()
-
 mode_demploi_text = {
     "mode_demploi_1": "Premièrement, il vous faudra choisir l’échelle à laquelle vous voulez évaluer le coût des maladies périnatales. Il est possible de choisir la France, l’une des 12 régions, l’un des 100 départements, l’une des 200 plus grandes villes ou l'une des 577 circonscriptions. Lorsque vous sélectionnez un territoire, le nombre de naissances en 2018 sur le territoire apparaît à droite. Vous pouvez toujours modifier directement ce chiffre à la main.",
     "mode_demploi_2": "Deuxièmement, il vous faudra ajuster les principales variables qui influent sur le résultat final. En effet, notre modélisation est fondée sur des hypothèses (les plus crédibles selon nous), mais il vous est possible de les ajuster pour refléter au mieux vos convictions et vos questions. Par exemple, il est difficile de connaître précisément la prévalence de la dépression périnatale en France, mais les estimations communément admises sont de 10%. Libre à vous de modifier la valeur si vous pensez que cette estimation est différente de la votre.",
@@ -132,363 +213,576 @@ mode_demploi_text = {
     "mode_demploi_4": "Une fois ces trois étapes remplies, il vous suffira de cliquer sur 'Générer l'analyse et une interface récapitulative des coûts à votre échelle et avec vos hypothèses apparaîtra : c’est le coût engendré par les maladies psychiques périnatales ! Tout au long de votre parcours, n’hésitez pas à cliquer sur les petits points d’interrogation, ils vous donneront des informations supplémentaires.",
 }
 
-mode_demploi = html.Div(
-    [
-        html.Div(
-            html.Ul(
+presentation_alliance_1 = "L’Alliance francophone pour la santé mentale périnatale ambitionne de regrouper le plus grand nombre d’associations nationales d’usager.e.s et de sociétés savantes pour plaider à tout moment et en tout lieu pour une authentique priorisation dans toutes les politiques publiques de la période périnatale, et plus particulièrement de sa dimension psychique. "
+
+presentation_alliance_2 = "Elle n’est, à ce jour, ni une société scientifique de plus, ni une association, ni une fédération. "
+
+presentation_alliance_3 = "Les (futurs) bébés et les (futurs) parents méritent une attention soutenue, au-delà de leurs proches, de la part de toute la société, attention qui commence par celle de l’ensemble des professionnels actifs dans cette période. Rassemblant des personnes morales, elle est rendue possible par l’engagement citoyen de tout membre de ses associations et sociétés. "
+
+logo_alliance = "http://alliancefrancophonepourlasantementaleperinatale.com/wp-content/uploads/2020/03/cropped-cropped-cropped-alliance-francaise-AFSMP-2-1-300x246.png"
+
+
+global territoires
+territoires = charger_territoires("naissance_echelons_clean.csv")
+
+
+@lru_cache(maxsize=None)
+def tabs_intro_title():
+    mode_demploi = html.Div(
+        [
+            html.Div(
+                html.Ul(
+                    [
+                        html.Li(html.Span(parag), style={"margin": "0 0 0.7em 0"})
+                        for parag in mode_demploi_text.values()
+                    ],
+                    style={
+                        "list-style-position": "outside",
+                        "text-align": "justify",
+                        "font-size": "1.2em",
+                    },
+                ),
+            ),
+        ],
+        style={
+            "border": "1px solid black",
+            "padding": "1.5em 1.5em 1.5em 1.5em",
+            "border-radius": "3px",
+        },
+    )
+
+    qui_sommes_nous = html.Div(
+        [
+            html.Div(
+                # "L'Alliance Francophone de Santé Mentale Périnatale est ",
                 [
-                    html.Li(html.Span(parag), style={"margin": "0 0 0.7em 0"})
-                    for parag in mode_demploi_text.values()
+                    html.Div(txt, style={"padding": "0 0 0.6em 0"})
+                    for txt in [
+                        presentation_alliance_1,
+                        presentation_alliance_2,
+                        presentation_alliance_3,
+                    ]
                 ],
-                style={
-                    "list-style-position": "outside",
-                    "text-align": "justify",
-                    "font-size": "1.2em",
-                },
-            ),
-        ),
-    ],
-    style={
-        "border": "1px solid black",
-        "padding": "1.5em 1.5em 1.5em 1.5em",
-        "border-radius": "3px",
-    },
-)
+                style={"font-size": "1.2em", "text-align": "justify"},
+            )
+        ],
+        style={
+            "border": "1px solid black",
+            "padding": "1.5em 1.5em 1.5em 1.5em",
+            "border-radius": "3px",
+        },
+    )
 
+    tabs_intro = dbc.Tabs(
+        [
+            dbc.Tab(get_pitch(), label="Raison d'être", tab_style=eq_width,),
+            dbc.Tab(mode_demploi, label="Mode d'emploi", tab_style=eq_width,),
+            dbc.Tab(qui_sommes_nous, label="Qui sommes-nous ?", tab_style=eq_width,),
+        ],
+    )
 
-presentation_alliance_1 = "L’Alliance francophone pour la santé mentale périnatale ambitionne de regrouper le plus grand nombre d’associations nationales d’usager.e.s et de sociétés savantes pour plaider à tout moment et en tout lieu pour une authentique priorisation dans toutes les politiques publiques de la période périnatale, et plus particulièrement de sa dimension psychique. "
+    return html.Div(
+        [html.H3("Introduction à l'outil", style={"color": "#8ec63f"}), tabs_intro]
+    )
 
-presentation_alliance_2 = "Elle n’est, à ce jour, ni une société scientifique de plus, ni une association, ni une fédération. "
 
-presentation_alliance_3 = "Les (futurs) bébés et les (futurs) parents méritent une attention soutenue, au-delà de leurs proches, de la part de toute la société, attention qui commence par celle de l’ensemble des professionnels actifs dans cette période. Rassemblant des personnes morales, elle est rendue possible par l’engagement citoyen de tout membre de ses associations et sociétés. "
+@lru_cache(maxsize=None)
+def navbar():
+    return dbc.Navbar(
+        [
+            html.A(
+                dbc.Row(
+                    [
+                        dbc.Col(html.Img(src=logo_alliance, height="70px")),
+                        dbc.Col(dbc.NavbarBrand("Outil Psypérinathon")),
+                    ],
+                    align="center",
+                    no_gutters=False,
+                ),
+                href="http://alliance-psyperinat.org/",
+                target="_blank",
+                style={"float": "left"},
+            ),
+            html.A(
+                "Alliance francophone pour la santé mentale périnatale",
+                href="http://alliance-psyperinat.org/",
+                target="_blank",
+                style={"margin-left": "auto", "margin-right": "0", "color": "black"},
+            ),
+        ],
+        color="#1b75bc",
+        light=True,
+        sticky="top",
+        style={"width": "100%", "float": "left"},
+    )
 
-qui_sommes_nous = html.Div(
-    [
-        html.Div(
-            # "L'Alliance Francophone de Santé Mentale Périnatale est ",
-            [
-                html.Div(txt, style={"padding": "0 0 0.6em 0"})
-                for txt in [
-                    presentation_alliance_1,
-                    presentation_alliance_2,
-                    presentation_alliance_3,
+
+@lru_cache(maxsize=None)
+def form_naissances():
+    return generate_form_naissances(territoires)
+
+
+@lru_cache(maxsize=None)
+def popovers():
+    pp_tableaux = dbc.Popover(
+        [
+            dbc.PopoverHeader("Coût par cas / coût par naissance"),
+            dbc.PopoverBody(
+                [
+                    html.Span("Le "),
+                    html.Span("coût par cas", style={"font-weight": "bold"}),
+                    html.Span(
+                        " désigne l’ensemble des coûts inhérents à l’occurence chez une mère d’une des trois maladies. "
+                    ),
+                    html.Br(),
+                    html.Span("Le "),
+                    html.Span("coût par naissance", style={"font-weight": "bold"}),
+                    html.Span(
+                        " désigne le coût total rapporté au nombre de naissances, c’est-à-dire combien coûte "
+                    ),
+                    html.Span("en moyenne", style={"font-style": "italic"}),
+                    html.Span(" les maladies. "),
                 ]
-            ],
-            style={"font-size": "1.2em", "text-align": "justify"},
-        )
-    ],
-    style={
-        "border": "1px solid black",
-        "padding": "1.5em 1.5em 1.5em 1.5em",
-        "border-radius": "3px",
-    },
-)
+            ),
+        ],
+        id={"type": "popover", "index": "cout-cas"},
+        target=f"badge-cout-cas",
+        is_open=False,
+    )
 
-tabs_intro = dbc.Tabs(
-    [
-        dbc.Tab(pitch, label="Raison d'être", tab_style=eq_width,),
-        dbc.Tab(mode_demploi, label="Mode d'emploi", tab_style=eq_width,),
-        dbc.Tab(qui_sommes_nous, label="Qui sommes-nous ?", tab_style=eq_width,),
-    ],
-)
+    return generate_popovers() + [pp_tableaux]
+
+
+@lru_cache(maxsize=None)
+def charts_coll():
+    # Camembert dont les valeurs sont remplies par assets/naissances.js. dict plutôt
+    # que go.Figure, dont la validation et le thème par défaut coûtent près d'une
+    # seconde : on ne reprend du thème que ce qui s'applique au camembert
+    pie_repartition = {
+        "data": [
+            {
+                "type": "pie",
+                "labels": SECTEURS,
+                "values": [1, 1, 1],
+                "marker": {"colors": ["#d91b5c", "#f7a5ab", "#8ec63f"]},
+                "textposition": "auto",
+                "textinfo": "label+percent",
+                "insidetextorientation": "horizontal",
+                "sort": False,
+                "automargin": True,
+                "hovertemplate": (
+                    "<b>%{label}</b><br>Coût : %{customdata[0]}<extra></extra>"
+                ),
+            }
+        ],
+        "layout": {
+            "title": {"text": "<b>Répartition des coûts par secteur</b>", "x": 0.05},
+            "font": {"color": "#2a3f5f"},
+            "hoverlabel": {"align": "left"},
+            "width": 350,
+            "height": 350,
+            "showlegend": False,
+        },
+    }
+
+    graphiques = dbc.Row(
+        [
+            dbc.Col(
+                [
+                    html.H4(
+                        f"A l'échelle de ce territoire, les coûts associés aux problèmes de santé mentale périnatale représentent chaque année :",
+                        style={"text-align": "center"},
+                    ),
+                    html.H1(id="total-couts", style={"text-align": "center"}),
+                    # même hypothèse que l'export territoires.py
+                    html.P(
+                        "Calculé avec le salaire horaire des femmes du territoire, "
+                        "repris dans les variables économiques.",
+                        style={"text-align": "center", "font-style": "italic"},
+                    ),
+                ],
+                style={"border": "0px solid black", "padding": "10% 2% 0 0"},
+            ),
+            dbc.Col(
+                [html.Div(make_card_repartition(), id="draw1")],
+                style={"border": "0px solid black", "padding": "5% 0 0 2%"},
+            ),
+            dbc.Col(
+                [dcc.Graph(id="example-graph-pie", figure=pie_repartition)],
+                style={"border": "0px solid black", "padding": "5% 0 0 0"},
+            ),
+        ],
+    )
 
-tabs_intro_title = html.Div(
-    [html.H3("Introduction à l'outil", style={"color": "#8ec63f"}), tabs_intro]
-)
+    tabs_resultats = dbc.Tabs(
+        [
+            dbc.Tab(
+                dbc.Row(
+                    [
+                        dbc.Col([html.Div(id="table1")]),
+                        dbc.Col([html.Div(id="table2")]),
+                    ]
+                ),
+                label="Coûts par cas et par naissance",
+                tab_style=eq_width,
+            ),
+            dbc.Tab(
+                dcc.Graph(id="graph-tornado"),
+                label="Sensibilité aux variables",
+                tab_style=eq_width,
+            ),
+        ],
+    )
 
+    tabs_and_title_variables = html.Div(
+        [
+            html.H2(
+                "Deuxième étape : ajustement des variables principales",
+                style={"color": "#8ec63f"},
+            ),
+            tabs_variables(),
+        ],
+        style={"padding": "0.5em 0 0.5em 0"},
+    )
 
-button_generate = dbc.Button(
-    "Générer l'analyse !", color="primary", block=True, id="button-generate", size="lg",
-)
+    tabs_and_title_maladies = html.Div(
+        [
+            html.H2(
+                "Troisième étape : pour aller plus loin...",
+                style={"color": "#8ec63f"},
+            ),
+            tabs_maladies(),
+        ],
+        style={"padding": "0.5em 0 0.5em 0"},
+    )
 
-button_adjust = dbc.Button(
-    "Ajuster l'analyse !", color="primary", block=True, id="button-adjust", size="lg",
-)
+    button_adjust = dbc.Button(
+        "Ajuster l'analyse !",
+        color="primary",
+        block=True,
+        id="button-adjust",
+        size="lg",
+    )
 
+    return dbc.Collapse(
+        [
+            html.H3("Principaux enseignements", style={"color": "#8ec63f"}),
+            graphiques,
+            html.H3(
+                ["Tableaux récapitulatifs  ", make_question_mark("cout-cas")],
+                style={"color": "#8ec63f"},
+            ),
+            tabs_resultats,
+            html.Hr(),
+            tabs_and_title_variables,
+            html.Hr(),
+            tabs_and_title_maladies,
+            html.Hr(),
+            button_adjust,
+            html.Hr(),
+        ],
+        id="collapsed-graphs",
+    )
 
-logo_alliance = "http://alliancefrancophonepourlasantementaleperinatale.com/wp-content/uploads/2020/03/cropped-cropped-cropped-alliance-francaise-AFSMP-2-1-300x246.png"
 
-navbar = dbc.Navbar(
-    [
-        html.A(
-            dbc.Row(
+def layout():
+    title = html.H1(
+        "Estimer le coût des maladies psypérinatales",
+        style={"padding": "3em 0 0.5em 0", "text-align": "center", "color": "#1b75bc"},
+    )
+
+    button_generate = dbc.Button(
+        "Générer l'analyse !",
+        color="primary",
+        block=True,
+        id="button-generate",
+        size="lg",
+    )
+
+    return html.Div(
+        [
+            navbar(),
+            dbc.Container(
                 [
-                    dbc.Col(html.Img(src=logo_alliance, height="70px")),
-                    dbc.Col(dbc.NavbarBrand("Outil Psypérinathon")),
-                ],
-                align="center",
-                no_gutters=False,
+                    title,
+                    html.Hr(),
+                    tabs_intro_title(),
+                    html.Hr(),
+                    html.Hr(),
+                    form_naissances(),
+                    html.Hr(),
+                    button_generate,
+                    html.Hr(),
+                    charts_coll(),
+                    html.Hr(),
+                    dcc.Store(id="store-par-naissance"),
+                ]
+                + popovers(),
+                id="main-container",
             ),
-            href="http://alliance-psyperinat.org/",
-            target="_blank",
-            style={"float": "left"},
-        ),
-        html.A(
-            "Alliance francophone pour la santé mentale périnatale",
-            href="http://alliance-psyperinat.org/",
-            target="_blank",
-            style={"margin-left": "auto", "margin-right": "0", "color": "black"},
-        ),
-    ],
-    color="#1b75bc",
-    light=True,
-    sticky="top",
-    style={"width": "100%", "float": "left"},
-)
+        ]
+    )
 
 
-global bdd_naissances
-bdd_naissances = pd.read_csv("naissance_echelons_clean.csv")
+app.layout = layout
 
-form_naissances = generate_form_naissances(bdd_naissances)
 
-title = html.H1(
-    "Estimer le coût des maladies psypérinatales",
-    style={"padding": "3em 0 0.5em 0", "text-align": "center", "color": "#1b75bc"},
+# Le nombre de naissances du territoire est traité dans le navigateur
+# (assets/naissances.js) : il ne fait que remettre à l'échelle les résultats par naissance
+app.clientside_callback(
+    ClientsideFunction(namespace="naissances", function_name="echelle"),
+    Output("nombre-naissances", "value"),
+    [Input("dd-echelle", "value")],
+    [State("store-naissances-options", "data")],
 )
 
-tabs_and_title_variables = html.Div(
-    [
-        html.H2(
-            "Deuxième étape : ajustement des variables principales",
-            style={"color": "#8ec63f"},
-        ),
-        tabs_variables,
-    ],
-    style={"padding": "0.5em 0 0.5em 0"},
+app.clientside_callback(
+    ClientsideFunction(namespace="naissances", function_name="rescale"),
+    [Output("total-couts", "children"), Output("example-graph-pie", "figure")],
+    [Input("store-par-naissance", "data"), Input("nombre-naissances", "value")],
+    [State("example-graph-pie", "figure")],
 )
 
-tabs_and_title_maladies = html.Div(
-    [
-        html.H2(
-            "Troisième étape : pour aller plus loin...", style={"color": "#8ec63f"}
-        ),
-        tabs_maladies,
-    ],
-    style={"padding": "0.5em 0 0.5em 0"},
-)
 
-pp_tableaux = dbc.Popover(
+@app.callback(
     [
-        dbc.PopoverHeader("Coût par cas / coût par naissance"),
-        dbc.PopoverBody(
-            [
-                html.Span("Le "),
-                html.Span("coût par cas", style={"font-weight": "bold"}),
-                html.Span(
-                    " désigne l’ensemble des coûts inhérents à l’occurence chez une mère d’une des trois maladies. "
-                ),
-                html.Br(),
-                html.Span("Le "),
-                html.Span("coût par naissance", style={"font-weight": "bold"}),
-                html.Span(
-                    " désigne le coût total rapporté au nombre de naissances, c’est-à-dire combien coûte "
-                ),
-                html.Span("en moyenne", style={"font-style": "italic"}),
-                html.Span(" les maladies. "),
-            ]
-        ),
+        Output("dd-echelle", "options"),
+        Output("store-naissances-options", "data"),
     ],
-    id=f"popover-cout-cas",
-    target=f"badge-cout-cas",
-    is_open=False,
+    [Input("recherche-territoire", "value"), Input("dd-type-echelon", "value")],
+    [State("dd-echelle", "value")],
 )
+def search_territoires(recherche, echelons, selection):
+    """Options du menu des territoires, calculées à la frappe plutôt qu'envoyées
+    toutes avec la page. Le territoire sélectionné reste toujours dans les options"""
+    resultats = rechercher(territoires, recherche, echelons)
+    if selection is not None and selection not in resultats.index:
+        resultats = pd.concat([territoires.loc[[selection]], resultats])
 
-question_mark_tableaux = dbc.Badge("?", pill=True, color="light", id="badge-cout-cas")
+    return options_dropdown(resultats), naissances_par_id(resultats)
 
-graphiques = dbc.Row(
-    [
-        dbc.Col(
-            [
-                html.H4(
-                    f"A l'échelle de ce territoire, les coûts associés aux problèmes de santé mentale périnatale représentent chaque année :",
-                    style={"text-align": "center"},
-                ),
-                html.H1(id="total-couts", style={"text-align": "center"}),
-            ],
-            style={"border": "0px solid black", "padding": "10% 2% 0 0"},
-        ),
-        dbc.Col(
-            [html.Div(id="draw1")],
-            style={"border": "0px solid black", "padding": "5% 0 0 2%"},
-        ),
-        dbc.Col(
-            [dcc.Graph(id="example-graph-pie")],
-            style={"border": "0px solid black", "padding": "5% 0 0 0"},
-        ),
-    ],
-)
 
-charts_coll = dbc.Collapse(
-    [
-        html.H3("Principaux enseignements", style={"color": "#8ec63f"}),
-        graphiques,
-        html.H3(
-            ["Tableaux récapitulatifs  ", question_mark_tableaux],
-            style={"color": "#8ec63f"},
-        ),
-        dbc.Row([dbc.Col([html.Div(id="table1")]), dbc.Col([html.Div(id="table2")])]),
-        html.Hr(),
-        tabs_and_title_variables,
-        html.Hr(),
-        tabs_and_title_maladies,
-        html.Hr(),
-        button_adjust,
-        html.Hr(),
-    ],
-    id="collapsed-graphs",
+@app.callback(
+    [Output(SLIDER_REVENU, "value"), Output(SLIDER_REVENU, "max")],
+    [Input("dd-echelle", "value")],
 )
+def salaire_territoire(selection):
+    """Le slider du revenu horaire prend le salaire horaire des femmes du territoire
+    choisi, qui entre dans les pertes de productivité. Son maximum est relevé si le
+    salaire le dépasse"""
+    if selection is None:
+        raise PreventUpdate
 
+    salaire = float(territoires.loc[selection, "Salaire horaire des femmes"])
+    return salaire, max(float(df_variables.loc[INDEX_REVENU, "maxi"]), salaire)
 
-app.layout = html.Div(
-    [
-        navbar,
-        dbc.Container(
-            [
-                title,
-                html.Hr(),
-                tabs_intro_title,
-                # pitch,
-                html.Hr(),
-                # mode_demploi,
-                html.Hr(),
-                form_naissances,
-                html.Hr(),
-                button_generate,
-                html.Hr(),
-                charts_coll,
-                html.Hr(),
-            ]
-            + generate_popovers()
-            + [pp_tableaux],
-            id="main-container",
-        ),
-    ]
-)
 
+def compute_par_naissance(sliders):
+    """Partie de compute_costs qui ne dépend que des sliders, sous forme de
+    ResultatModele (tableaux numpy). Résultats mis en cache par vecteur de sliders"""
+    cle = cle_sliders(sliders)
+    resultat = table_presets.get(cle)
+    if resultat is not None:
+        return resultat
 
-@app.callback(Output("nombre-naissances", "value"), [Input("dd-echelle", "value")])
-def upd_input_echelle(val):
-    return int(val)
+    resultat = cache_resultats.get(cle)
+    if resultat is None:
+        resultat = evaluer(sliders, positions_modele)
+        cache_resultats.set(cle, resultat)
+
+    return resultat
+
+
+def _sans_mesure(etape):
+    return nullcontext()
+
+
+def sorties_couts(resultat, chrono=_sans_mesure):
+    """Sorties du callback compute_costs pour un ResultatModele. chrono : mesure de
+    chaque étape (DUREE_ETAPES.chrono), aucune par défaut"""
+    with chrono("mise_en_forme"):
+        # mise en forme des tableaux affichés, hors du calcul mis en cache
+        df_par_cas, df_par_naissance, _ = (
+            df.reset_index() for df in tableaux(resultat)
+        )
+
+        proportion_mere, proportion_bebe = proportions_mere_bebe(df_par_naissance)
+
+        def formating(x):
+            return "{:,} €".format(x).replace(",", " ")
+
+        for df in [df_par_cas, df_par_naissance]:  # formatte les 2 tableaux en euros
+            for c in df.columns:
+                if df[c].dtype != "object":
+                    df[c] = df[c].astype(int).apply(formating)
+
+        df_par_cas.columns = [
+            c if i > 0 else "Coût par cas" for i, c in enumerate(df_par_cas.columns)
+        ]
+        df_par_naissance.columns = [
+            c if i > 0 else "Coût par naissance"
+            for i, c in enumerate(df_par_naissance.columns)
+        ]
+
+    with chrono("generate_table_from_df"):
+        table_cas = generate_table_from_df(
+            dbc.Table,
+            df_par_cas,
+            striped=True,
+            bordered=True,
+            hover=True,
+            italic_last=False,
+        )
+
+        table_naissance = generate_table_from_df(
+            dbc.Table,
+            df_par_naissance,
+            striped=True,
+            bordered=True,
+            hover=True,
+            italic_last=True,
+        )
+
+    # coûts pour une naissance : le callback client les multiplie par le nombre
+    # de naissances du territoire et met à jour le camembert
+    par_naissance = {
+        "total_par_naissance": resultat.total_par_naissance,
+        "repartition": resultat.repartition.tolist(),
+    }
+
+    return table_cas, table_naissance, proportion_mere, proportion_bebe, par_naissance
+
+
+@profile
+def compute_costs(n_generate, n_adjust, *sliders):
+    """sliders : valeurs dans l'ordre des lignes de bdd_variables.csv.
+    La durée de chaque étape est mesurée dans DUREE_ETAPES (voir /metrics)"""
+    with DUREE_ETAPES.chrono("modele"):
+        resultat = compute_par_naissance(sliders)
+
+    return sorties_couts(resultat, DUREE_ETAPES.chrono)
 
 
 @app.callback(
     [
         Output("table1", "children"),
         Output("table2", "children"),
-        Output("draw1", "children"),
-        Output("total-couts", "children"),
-        Output("example-graph-pie", "figure"),
+        Output("proportion-mere", "children"),
+        Output("proportion-bebe", "children"),
+        Output("store-par-naissance", "data"),
     ],
+    # le changement de territoire, via le revenu horaire, relance aussi le calcul
     [
         Input("button-generate", "n_clicks"),
         Input("button-adjust", "n_clicks"),
-        Input("nombre-naissances", "value"),
+        Input(SLIDER_REVENU, "value"),
     ],
-    [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
+    [State({"type": "slider", "index": ALL}, "value")],
 )
-def compute_costs(n_generate, n_adjust, n_naissances, *sliders):
-    df_variables_upd = df_variables.copy()
-    df_variables_upd["upd_variables"] = sliders
-
-    df_par_cas, df_repartition = process_values(df_variables_upd)
-    df_par_cas = df_par_cas.reset_index()
-    print(df_par_cas)
-
-    prevalences = (
-        df_variables_upd.set_index("nom_variable")
-        .loc[
-            [
-                "Prévalence de " + mal
-                for mal in ["la dépression", "l'anxiété", "la psychose"]
-            ]
-        ]
-        .iloc[:, -1]
-        .values
-        / 100
+def compute_costs_callback(n_generate, n_adjust, revenu, sliders):
+    sliders = sliders_ordonnes(sliders)
+    sorties = sorties_presets.get(cle_sliders(sliders))
+    if sorties is not None:
+        return sorties["compute_costs"]
+    return compute_costs(n_generate, n_adjust, *sliders)
+
+
+def sliders_ordonnes(sliders):
+    """ALL renvoie les sliders dans l'ordre du layout : on les remet dans l'ordre des
+    lignes de bdd_variables.csv grâce à leur index"""
+    indices = [state["id"]["index"] for state in dash.callback_context.states_list[0]]
+    return [valeur for _, valeur in sorted(zip(indices, sliders))]
+
+
+def figure_tornado(sliders):
+    """Diagramme en tornade : écart au coût total par naissance quand chaque variable
+    passe à son mini ou à son maxi, les autres restant aux valeurs des sliders"""
+    reference, totaux = tornado(
+        sliders, df_variables["mini"], df_variables["maxi"], positions_modele
     )
+    ecarts = totaux - reference
+    # barres les plus longues en haut
+    ordre = np.argsort(ecarts.max(axis=1) - ecarts.min(axis=1))[-TORNADO_N_BARRES:]
+    noms = df_variables["nom_variable"].to_numpy()[ordre]
+
+    # dict plutôt que go.Figure : la validation de plotly coûterait plus que le
+    # calcul des 2 * n_vars scénarios
+    figure = {
+        "data": [
+            {
+                "type": "bar",
+                "y": noms.tolist(),
+                "x": ecarts[ordre, i].tolist(),
+                "base": float(reference),
+                "customdata": totaux[ordre, i].tolist(),
+                "orientation": "h",
+                "name": nom,
+                "marker": {"color": couleur},
+                "hovertemplate": (
+                    "%{y}<br>Coût par naissance : %{customdata:,.0f} €"
+                    "<extra></extra>"
+                ),
+            }
+            for i, (nom, couleur) in enumerate(
+                [
+                    ("Variable au minimum", "#8ec63f"),
+                    ("Variable au maximum", "#d91b5c"),
+                ]
+            )
+        ],
+        "layout": {
+            "title": "<b>Coût total par naissance selon chaque variable</b>",
+            "barmode": "overlay",
+            "height": 150 + 30 * len(ordre),
+            "xaxis": {"title": "Coût total par naissance (€)"},
+            "yaxis": {"automargin": True},
+            "legend": {"orientation": "h"},
+        },
+    }
+    return figure
 
-    df_par_naissance = df_par_cas.copy()
-    df_par_naissance.iloc[:, 1:] = df_par_naissance.iloc[:, 1:].mul(prevalences, axis=0)
-
-    # for df in [df_par_naissance]:
-    df_par_naissance.loc["3 maladies"] = ["Total des trois maladies"] + np.sum(
-        df_par_naissance.values[:, 1:], axis=0
-    ).tolist()
-
-    total_par_cas = df_par_naissance["Total"].iloc[:-1].sum()
-
-    print(f"Nombre naissances = {n_naissances}\n")
-    if n_naissances is None:
-        n_naissances = 1  # set 1 as default to avoid problems if values is not defined
 
-    cout_total = total_par_cas * n_naissances
-    cout_total_str = millify(cout_total)
-    print(cout_total_str)
+@profile
+def compute_tornado(*sliders):
+    """figure_tornado, mise en cache par vecteur de sliders"""
+    cle = cle_sliders(sliders)
+    figure = cache_tornado.get(cle)
 
-    df_repartition["couts_totaux"] = (
-        df_repartition["Répartition des coûts par secteur"] * cout_total
-    )
-    df_repartition["couts_lisibles"] = df_repartition["couts_totaux"].apply(millify)
-
-    pie_maladies = px.pie(
-        df_repartition,
-        values="couts_totaux",
-        names=df_repartition.index,
-        title="<b>Répartition des coûts par secteur</b>",
-        width=350,
-        height=350,
-        color="couts_totaux",
-        color_discrete_sequence=["#d91b5c", "#f7a5ab", "#8ec63f"],
-    )
+    if figure is None:
+        figure = figure_tornado(sliders)
+        cache_tornado.set(cle, figure)
 
-    pie_maladies.update_traces(
-        textposition="auto",
-        textinfo="label+percent",
-        insidetextorientation="horizontal",
-        sort=False,
-        customdata=df_repartition["couts_lisibles"],
-        hovertemplate="<b>%{label}</b><br>Coût : %{customdata[0]}",
-    )
-    pie_maladies.update_layout(showlegend=False)
-
-    card_repartition = make_card_repartition(df_par_naissance)
-
-    def formating(x):
-        return "{:,} €".format(x).replace(",", " ")
-
-    for df in [df_par_cas, df_par_naissance]:  # formatte les 2 tableaux en euros
-        for c in df.columns:
-            if df[c].dtype != "object":
-                df[c] = df[c].astype(int).apply(formating)
-
-    df_par_cas.columns = [
-        c if i > 0 else "Coût par cas" for i, c in enumerate(df_par_cas.columns)
-    ]
-    df_par_naissance.columns = [
-        c if i > 0 else "Coût par naissance"
-        for i, c in enumerate(df_par_naissance.columns)
-    ]
-
-    table_cas = generate_table_from_df(
-        dbc.Table,
-        df_par_cas,
-        striped=True,
-        bordered=True,
-        hover=True,
-        italic_last=False,
-    )
+    return figure
 
-    table_naissance = generate_table_from_df(
-        dbc.Table,
-        df_par_naissance,
-        striped=True,
-        bordered=True,
-        hover=True,
-        italic_last=True,
-    )
 
-    return table_cas, table_naissance, card_repartition, cout_total_str, pie_maladies
+@app.callback(
+    Output("graph-tornado", "figure"),
+    [
+        Input("button-generate", "n_clicks"),
+        Input("button-adjust", "n_clicks"),
+        Input(SLIDER_REVENU, "value"),
+    ],
+    [State({"type": "slider", "index": ALL}, "value")],
+)
+def compute_tornado_callback(n_generate, n_adjust, revenu, sliders):
+    sliders = sliders_ordonnes(sliders)
+    sorties = sorties_presets.get(cle_sliders(sliders))
+    if sorties is not None:
+        return sorties["compute_tornado"]
+    return compute_tornado(*sliders)
+
+
+# Sorties complètes des callbacks pour chaque preset, dont les valeurs par défaut :
+# un clic sur « Générer » sans toucher aux sliders n'est plus qu'une recherche.
+# Calculées sans passer par compute_costs et compute_tornado, pour ne fausser ni les
+# métriques, ni les caches, ni les profils au démarrage
+sorties_presets = {
+    cle: {
+        "compute_costs": sorties_couts(table_presets.get(cle)),
+        "compute_tornado": figure_tornado(table_presets.vecteurs[nom]),
+    }
+    for cle, nom in table_presets.noms.items()
+}
 
 
 # CALLBACK GRAPHS
@@ -503,41 +797,29 @@ def toggle_collapse(n_generate, n_adjust, is_open):
     return is_open
 
 
+@app.callback(
+    Output({"type": "collapsible", "index": MATCH}, "is_open"),
+    [Input({"type": "open-tab", "index": MATCH}, "n_clicks")],
+    [State({"type": "collapsible", "index": MATCH}, "is_open")],
+)
 def toggle_collapse_maladies(n, is_open):
     if n:
         return not is_open
     return is_open
 
 
-for item_maladie in [
-    "Dépression-Mère",
-    "Dépression-Bébé",
-    "Anxiété-Mère",
-    "Anxiété-Bébé",
-    "Psychose-Mère",
-    "Psychose-Bébé",
-]:
-    app.callback(
-        Output(f"collapsible-{item_maladie}", "is_open"),
-        [Input(f"open-tab-{item_maladie}", "n_clicks")],
-        [State(f"collapsible-{item_maladie}", "is_open")],
-    )(toggle_collapse_maladies)
-
 # CALLBACK POPOVERS
+@app.callback(
+    Output({"type": "popover", "index": MATCH}, "is_open"),
+    [Input({"type": "question-mark", "index": MATCH}, "n_clicks")],
+    [State({"type": "popover", "index": MATCH}, "is_open")],
+)
 def toggle_popover(n, is_open):
     if n:
         return not is_open
     return is_open
 
 
-for i in list(range(nb_variables_total)) + ["cout-cas"]:
-    app.callback(
-        Output(f"popover-{i}", "is_open"),
-        [Input(f"badge-{i}", "n_clicks")],
-        [State(f"popover-{i}", "is_open")],
-    )(toggle_popover)
-
-
 if __name__ == "__main__":
     app.run_server(
         debug=False, port=1234,
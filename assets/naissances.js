@@ -0,0 +1,48 @@
+// Callbacks exécutés dans le navigateur : changer le nombre de naissances ne fait
+// que remettre à l'échelle les résultats par naissance du Store. Le salaire du
+// territoire passe par le slider du revenu horaire (callback salaire_territoire).
+
+function millify(n) {
+    var millnames = ["", " mille €", " millions d'€", " milliards d'€"];
+    var millidx = Math.max(
+        0,
+        Math.min(
+            millnames.length - 1,
+            Math.floor(n === 0 ? 0 : Math.log10(Math.abs(n)) / 3)
+        )
+    );
+    return (n / Math.pow(10, 3 * millidx)).toFixed(1) + millnames[millidx];
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    naissances: {
+        echelle: function(id_territoire, naissances_par_id) {
+            if (id_territoire === null || id_territoire === undefined) {
+                return window.dash_clientside.no_update;
+            }
+            return Math.trunc(naissances_par_id[id_territoire]);
+        },
+
+        rescale: function(par_naissance, n_naissances, figure) {
+            if (!par_naissance) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+            if (n_naissances === null || n_naissances === undefined) {
+                n_naissances = 1;  // comme compute_costs si le nombre n'est pas défini
+            }
+
+            var cout_total = par_naissance.total_par_naissance * n_naissances;
+            var couts_totaux = par_naissance.repartition.map(function(part) {
+                return part * cout_total;
+            });
+
+            figure = JSON.parse(JSON.stringify(figure));
+            figure.data[0].values = couts_totaux;
+            figure.data[0].customdata = couts_totaux.map(function(cout) {
+                return [millify(cout)];
+            });
+
+            return [millify(cout_total), figure];
+        }
+    }
+});
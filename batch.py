@@ -0,0 +1,248 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import SQLiteCache, evaluer_avec_cache
+from model import MALADIES, SECTEURS_TEXTE, VARIABLES, compile_model, params_from_df
+from model import evaluer_lot, process_values_batch, prevalences_params
+from model import signature_modele
+
+
+CHUNK_SIZE = 10_000
+
+
+# Paramètres de référence partagés en lecture seule par chaque processus
+_partage = dict()
+
+
+def _init_worker(params_base, positions, colonnes, id_column, cache_path=None):
+    _partage.update(
+        params_base=params_base,
+        positions=positions,
+        colonnes=colonnes,
+        id_column=id_column,
+        cache=(
+            SQLiteCache(cache_path, version=signature_modele(positions))
+            if cache_path
+            else None
+        ),
+    )
+
+
+def colonnes_variables(df_variables):
+    """Position dans le vecteur de paramètres de chaque nom de colonne accepté dans un
+    fichier de scénarios : nom_variable de bdd_variables.csv ou alias de model.VARIABLES"""
+
+    colonnes = {nom: i for i, nom in enumerate(df_variables["nom_variable"])}
+    colonnes.update(
+        {alias: colonnes[nom] for alias, nom in VARIABLES.items() if nom in colonnes}
+    )
+    return colonnes
+
+
+def _parquet():
+    """pyarrow n'est pas dans requirements.txt : il n'est requis que pour le Parquet"""
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError as erreur:
+        raise ImportError(
+            "pyarrow >= 3.0 est requis pour lire ou écrire du Parquet "
+            "(pip install 'pyarrow>=3')"
+        ) from erreur
+
+    if int(pyarrow.__version__.split(".")[0]) < 3:
+        raise ImportError(
+            f"pyarrow >= 3.0 est requis pour le Parquet (version {pyarrow.__version__})"
+        )
+    return pyarrow, pq
+
+
+def lire_scenarios(path, chunk_size=CHUNK_SIZE):
+    """Lit un fichier de scénarios CSV, JSONL ou Parquet par paquets de chunk_size
+    lignes, sans le charger entièrement en mémoire. Un fichier .json (tableau
+    d'objets) ne se lit pas par morceaux : il est chargé en entier puis découpé"""
+
+    if path.endswith(".parquet"):
+        _, pq = _parquet()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith(".jsonl"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif path.endswith(".json"):
+        scenarios = pd.read_json(path, orient="records")
+        for debut in range(0, len(scenarios), chunk_size):
+            yield scenarios.iloc[debut : debut + chunk_size]
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def evaluer_scenarios(scenarios):
+    """Coûts par naissance et répartition par secteur d'un paquet de scénarios : les
+    colonnes du paquet remplacent les valeurs de référence des variables concernées.
+    Une valeur absente (clé manquante en JSONL, cellule vide en CSV) garde la valeur
+    de référence"""
+
+    id_column = _partage["id_column"]
+    params = np.tile(_partage["params_base"], (len(scenarios), 1))
+    for colonne in scenarios.columns.drop(id_column, errors="ignore"):
+        j = _partage["colonnes"][colonne]
+        valeurs = scenarios[colonne].to_numpy(dtype=np.float64, na_value=np.nan)
+        params[:, j] = np.where(np.isnan(valeurs), params[:, j], valeurs)
+
+    positions = _partage["positions"]
+    if _partage["cache"] is None:
+        couts, repartition = process_values_batch(params, positions)
+        par_naissance = couts[..., 2] * prevalences_params(params, positions)
+    else:
+        # scénarios déjà évalués par l'application, un autre lot ou l'analyse de
+        # sensibilité relus dans le cache partagé, les autres évalués en un lot
+        resultats = evaluer_avec_cache(
+            params, _partage["cache"], lambda p: evaluer_lot(p, positions)
+        )
+        par_naissance = np.array([r.par_naissance[:, 2] for r in resultats])
+        repartition = np.array([r.repartition for r in resultats])
+
+    resultats = pd.DataFrame(
+        np.column_stack([par_naissance.sum(axis=1), par_naissance, repartition]),
+        columns=["Coût total par naissance"]
+        + [f"Coût par naissance - {m}" for m in MALADIES]
+        + [f"Part - {s}" for s in SECTEURS_TEXTE],
+    )
+    if id_column in scenarios.columns:
+        resultats.insert(0, id_column, scenarios[id_column].to_numpy())
+    return resultats
+
+
+def _map_borne(executor, fn, iterable, en_vol):
+    """Comme executor.map, mais sans soumettre plus de en_vol paquets à la fois : le
+    fichier d'entrée n'est lu qu'au rythme où les résultats sont écrits"""
+
+    futures = deque()
+    for item in iterable:
+        futures.append(executor.submit(fn, item))
+        if len(futures) >= en_vol:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+class Ecrivain:
+    """Écrit les résultats au fil de l'eau, en CSV, JSONL ou Parquet selon l'extension"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._premier = True
+
+    def ecrire(self, df):
+        if self.path.endswith(".parquet"):
+            pa, pq = _parquet()
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        elif self.path.endswith(".jsonl"):
+            lignes = df.to_json(orient="records", lines=True, force_ascii=False)
+            with open(self.path, "w" if self._premier else "a", encoding="utf-8") as f:
+                f.write(lignes if lignes.endswith("\n") else lignes + "\n")
+        else:
+            df.to_csv(
+                self.path,
+                index=False,
+                header=self._premier,
+                mode="w" if self._premier else "a",
+            )
+        self._premier = False
+
+    def fermer(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run_batch(
+    df_variables,
+    input_path,
+    output_path,
+    chunk_size=CHUNK_SIZE,
+    n_jobs=None,
+    id_column="scenario",
+    cache_path=None,
+):
+    """Fait passer tous les scénarios de input_path dans le modèle, par paquets, sur
+    n_jobs processus (1 : dans le processus courant), et écrit les résultats dans
+    output_path au fur et à mesure. Renvoie le nombre de scénarios traités.
+    cache_path : base SQLite du cache de résultats partagé (cache.SQLiteCache)"""
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    colonnes = colonnes_variables(df_variables)
+    initargs = (
+        params_from_df(df_variables),
+        compile_model(df_variables),
+        colonnes,
+        id_column,
+        cache_path,
+    )
+
+    def paquets():
+        for scenarios in lire_scenarios(input_path, chunk_size):
+            inconnues = set(scenarios.columns) - set(colonnes) - {id_column}
+            if inconnues:
+                raise ValueError(f"Variables inconnues dans {input_path} : {inconnues}")
+            yield scenarios
+
+    ecrivain = Ecrivain(output_path)
+    n_scenarios = 0
+    try:
+        if n_jobs == 1:
+            _init_worker(*initargs)
+            for resultat in map(evaluer_scenarios, paquets()):
+                ecrivain.ecrire(resultat)
+                n_scenarios += len(resultat)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_worker, initargs=initargs
+            ) as executor:
+                for resultat in _map_borne(
+                    executor, evaluer_scenarios, paquets(), 2 * n_jobs
+                ):
+                    ecrivain.ecrire(resultat)
+                    n_scenarios += len(resultat)
+    finally:
+        ecrivain.fermer()
+
+    return n_scenarios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Évalue un fichier de scénarios (CSV, JSON, JSONL ou Parquet), chaque "
+            "colonne remplaçant la valeur d'une variable de bdd_variables.csv"
+        )
+    )
+    parser.add_argument("input")
+    parser.add_argument("output", help="fichier .csv, .jsonl ou .parquet")
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--id-column", default="scenario")
+    parser.add_argument("--cache", help="base SQLite du cache de résultats partagé")
+    args = parser.parse_args()
+
+    n = run_batch(
+        pd.read_csv(args.variables),
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        n_jobs=args.n_jobs,
+        id_column=args.id_column,
+        cache_path=args.cache,
+    )
+    print(f"{n} scénarios évalués -> {args.output}")
@@ -0,0 +1,299 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+
+# nom -> fonction de préparation, qui renvoie la fonction à chronométrer
+BENCHMARKS = dict()
+
+TAILLES_BATCH = [1_000, 10_000, 100_000]
+TAILLES_PSA = [10_000, 100_000]
+
+
+def benchmark(nom):
+    def enregistrer(preparation):
+        BENCHMARKS[nom] = preparation
+        return preparation
+
+    return enregistrer
+
+
+def _variables():
+    return pd.read_csv("bdd_variables.csv")
+
+
+def _params(n, seed=0):
+    import model
+
+    params = model.params_from_df(_variables())
+    rng = np.random.default_rng(seed)
+    return params * rng.uniform(0.5, 1.5, (n, len(params)))
+
+
+# MODELE
+@benchmark("model.process_values")
+def _():
+    from model import process_values
+
+    df = _variables()
+    return lambda: process_values(df)
+
+
+@benchmark("model.process_values_sensi")
+def _():
+    from model import process_values_sensi
+
+    df = _variables()
+    return lambda: process_values_sensi(df)
+
+
+@benchmark("model.get_revenu_moyen_femme")
+def _():
+    from model import get_revenu_moyen_femme
+
+    df = _variables()
+    return lambda: get_revenu_moyen_femme(df)
+
+
+@benchmark("model.evaluer")
+def _():
+    from model import compile_model, evaluer, params_from_df
+
+    df = _variables()
+    params, positions = params_from_df(df), compile_model(df)
+    return lambda: evaluer(params, positions)
+
+
+def _batch(n):
+    def preparation():
+        from model import default_positions, process_values_batch
+
+        params, positions = _params(n), default_positions()
+        return lambda: process_values_batch(params, positions)
+
+    return preparation
+
+
+for _n in TAILLES_BATCH:
+    benchmark(f"model.process_values_batch[{_n}]")(_batch(_n))
+
+
+# APPLICATION
+def _importer(code):
+    # import à froid, dans un nouveau processus (à comparer à python.demarrage)
+    return lambda: subprocess.run([sys.executable, "-c", code], check=True)
+
+
+# démarrage d'un worker : app ne construit plus sa mise en page à l'import (nom
+# conservé pour comparer aux mesures précédentes)
+benchmark("app.layout")(lambda: _importer("import app"))
+# démarrage suivi du premier chargement de la page, qui construit la mise en page
+benchmark("app.layout[premier chargement]")(
+    lambda: _importer("import app; app.app.layout()")
+)
+benchmark("model.import")(lambda: _importer("import model"))
+
+
+@benchmark("python.demarrage")
+def _():
+    return lambda: subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+
+def _sliders_hors_presets(app):
+    """Sliders tirés entre mini et maxi : les valeurs par défaut sont un preset, dont
+    les sorties sont précalculées et ne passent ni par le modèle ni par le cache"""
+    rng = np.random.default_rng(0)
+    sliders = rng.uniform(app.df_variables["mini"], app.df_variables["maxi"])
+    assert app.cle_sliders(sliders) not in app.sorties_presets
+    return sliders.tolist()
+
+
+@benchmark("app.compute_costs[cache vide]")
+def _():
+    import app
+
+    sliders = _sliders_hors_presets(app)
+
+    def appel():
+        app.cache_resultats.clear()
+        app.compute_costs(1, None, *sliders)
+
+    return appel
+
+
+@benchmark("app.compute_costs[en cache]")
+def _():
+    import app
+
+    sliders = _sliders_hors_presets(app)
+    app.compute_costs(1, None, *sliders)
+    return lambda: app.compute_costs(1, None, *sliders)
+
+
+# LOTS ET SENSIBILITE
+def _run_batch(n):
+    def preparation():
+        from batch import run_batch
+
+        dossier = tempfile.mkdtemp()
+        entree = os.path.join(dossier, "scenarios.csv")
+        sortie = os.path.join(dossier, "resultats.csv")
+        df = _variables()
+        pd.DataFrame(_params(n), columns=df["nom_variable"]).to_csv(entree, index=False)
+        return lambda: run_batch(df, entree, sortie, n_jobs=1)
+
+    return preparation
+
+
+for _n in TAILLES_BATCH[:-1]:
+    benchmark(f"batch.run_batch[{_n}]")(_run_batch(_n))
+
+
+def _psa(n):
+    def preparation():
+        from psa import run_psa
+
+        df = _variables()
+        return lambda: run_psa(df, n, seed=0)
+
+    return preparation
+
+
+for _n in TAILLES_PSA:
+    benchmark(f"psa.run_psa[{_n}]")(_psa(_n))
+
+
+def _bauer_hamby(n_points):
+    def preparation():
+        from sensibilite import run_bauer_hamby
+
+        df = _variables()
+        return lambda: run_bauer_hamby(df, n_points, n_jobs=1)
+
+    return preparation
+
+
+for _n in [3, 11]:
+    benchmark(f"sensibilite.run_bauer_hamby[{_n} points]")(_bauer_hamby(_n))
+
+
+@benchmark("sensibilite.tornado")
+def _():
+    from model import default_positions, params_from_df
+    from sensibilite import tornado
+
+    df = _variables()
+    params = params_from_df(df)
+    return lambda: tornado(params, df["mini"], df["maxi"], default_positions())
+
+
+@benchmark("sensibilite_globale.sobol_indices[1000]")
+def _():
+    from sensibilite_globale import sobol_indices
+
+    df = _variables()
+    return lambda: sobol_indices(df, n=1_000, seed=0)
+
+
+def chronometrer(fonction, repetitions=5, duree_min=0.2):
+    """Comme timeit en ligne de commande : nombre d'appels par mesure choisi pour
+    durer au moins duree_min secondes, puis repetitions mesures"""
+
+    timer = timeit.Timer(fonction)
+    nombre = 1
+    while timer.timeit(nombre) < duree_min and nombre < 1_000_000:
+        nombre *= 10
+    temps = np.array(timer.repeat(repeat=repetitions, number=nombre)) / nombre
+    return {
+        "nombre": nombre,
+        "repetitions": repetitions,
+        "min_s": temps.min(),
+        "mediane_s": float(np.median(temps)),
+        "moyenne_s": temps.mean(),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def run_benchmarks(filtre=None, repetitions=5, duree_min=0.2):
+    resultats = dict()
+    for nom, preparation in BENCHMARKS.items():
+        if filtre and filtre not in nom:
+            continue
+        resultats[nom] = chronometrer(preparation(), repetitions, duree_min)
+        print(f"{nom:<45} {1e3 * resultats[nom]['min_s']:>12.3f} ms", flush=True)
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "resultats": resultats,
+    }
+
+
+def comparer(ancien, nouveau):
+    """Rapport nouveau / ancien des temps minimaux, pour les benchmarks communs"""
+    communs = [nom for nom in nouveau["resultats"] if nom in ancien["resultats"]]
+    return pd.DataFrame(
+        {
+            "Avant (ms)": [1e3 * ancien["resultats"][nom]["min_s"] for nom in communs],
+            "Après (ms)": [1e3 * nouveau["resultats"][nom]["min_s"] for nom in communs],
+        },
+        index=communs,
+    ).assign(Rapport=lambda df: df["Après (ms)"] / df["Avant (ms)"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mesure les temps du modèle, de l'application et des analyses"
+    )
+    parser.add_argument("--filtre", help="ne lance que les benchmarks contenant ce texte")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--duree-min", type=float, default=0.2)
+    parser.add_argument(
+        "--output", help="fichier JSON (par défaut benchmarks/<date>-<commit>.json)"
+    )
+    parser.add_argument("--comparer", help="fichier JSON d'une mesure précédente")
+    parser.add_argument("--lister", action="store_true")
+    args = parser.parse_args()
+
+    if args.lister:
+        print("\n".join(BENCHMARKS))
+        sys.exit()
+
+    mesure = run_benchmarks(args.filtre, args.repetitions, args.duree_min)
+
+    output = args.output
+    if output is None:
+        os.makedirs("benchmarks", exist_ok=True)
+        output = os.path.join(
+            "benchmarks", f"{mesure['date'][:10]}-{mesure['commit']}.json"
+        )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(mesure, f, indent=2, ensure_ascii=False)
+    print(f"-> {output}")
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            print(comparer(json.load(f), mesure).round(3).to_string())
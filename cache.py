@@ -0,0 +1,261 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def cle_sliders(sliders):
+    """Clé canonique d'un vecteur de valeurs de variables (sliders ou upd_variables) :
+    empreinte des valeurs converties en float64, pour que 3 et 3.0 donnent la même clé"""
+    valeurs = np.ascontiguousarray(np.asarray(sliders, dtype=np.float64))
+    return hashlib.sha1(valeurs.tobytes()).hexdigest()
+
+
+class LRUCache:
+    """Cache borné en mémoire : au-delà de maxsize entrées, la moins récemment
+    utilisée est évincée. Compte les hits et les misses"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._donnees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle, defaut=None):
+        with self._verrou:
+            if cle not in self._donnees:
+                self.misses += 1
+                return defaut
+            self.hits += 1
+            self._donnees.move_to_end(cle)
+            return self._donnees[cle]
+
+    def set(self, cle, valeur):
+        with self._verrou:
+            self._donnees[cle] = valeur
+            self._donnees.move_to_end(cle)
+            while len(self._donnees) > self.maxsize:
+                self._donnees.popitem(last=False)
+
+    def clear(self):
+        with self._verrou:
+            self._donnees.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._donnees)
+
+    def __contains__(self, cle):
+        return cle in self._donnees
+
+
+# dates d'accès des hits gardées en mémoire avant d'être écrites d'un coup
+ACCES_EN_ATTENTE = 1_000
+
+
+class SQLiteCache:
+    """Cache partagé entre processus (workers gunicorn, CLI batch, analyse de
+    sensibilité) dans une base SQLite en mode WAL : les lectures ne bloquent pas les
+    écritures des autres processus. Valeurs picklées. Une lecture n'écrit rien : la
+    date d'accès des hits, qui sert à l'éviction, est reportée avec l'écriture
+    suivante ou par paquets de ACCES_EN_ATTENTE.
+
+    ttl : durée de vie d'une entrée en secondes (None : pas d'expiration)
+    maxsize : au-delà, les entrées les moins récemment utilisées sont évincées
+    version : préfixe des clés (model.signature_modele) : après un changement du
+    modèle, les anciens résultats ne sont plus relus et finissent évincés
+    Les compteurs hits et misses sont propres à chaque instance"""
+
+    def __init__(self, path, maxsize=100_000, ttl=None, version=""):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._ecritures = 0
+        self._acces = dict()
+        self._verrou = threading.Lock()
+        with self._connexion() as connexion:
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(cle TEXT PRIMARY KEY, valeur BLOB, cree REAL, acces REAL)"
+            )
+            connexion.execute("CREATE INDEX IF NOT EXISTS cache_acces ON cache (acces)")
+
+    def _connexion(self):
+        # une connexion par thread et par processus : elles ne se partagent pas
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None or self._local.pid != os.getpid():
+            import sqlite3
+
+            connexion = sqlite3.connect(self.path, timeout=30)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion, self._local.pid = connexion, os.getpid()
+        return connexion
+
+    def _cle(self, cle):
+        return f"{self.version}:{cle}"
+
+    def get_many(self, cles):
+        """dict cle -> valeur des clés présentes et non expirées"""
+        cles = list(cles)
+        maintenant = time.time()
+        trouves = dict()
+        connexion = self._connexion()
+        # par paquets, sous la limite de variables d'une requête SQLite
+        for debut in range(0, len(cles), 500):
+            paquet = cles[debut : debut + 500]
+            lignes = connexion.execute(
+                "SELECT cle, valeur, cree FROM cache WHERE cle IN ({})".format(
+                    ",".join("?" * len(paquet))
+                ),
+                [self._cle(cle) for cle in paquet],
+            ).fetchall()
+            for cle, valeur, cree in lignes:
+                if self.ttl is None or maintenant - cree <= self.ttl:
+                    trouves[cle[len(self.version) + 1 :]] = pickle.loads(valeur)
+
+        if trouves:
+            with self._verrou:
+                self._acces.update(dict.fromkeys(map(self._cle, trouves), maintenant))
+                plein = len(self._acces) >= ACCES_EN_ATTENTE
+            if plein:
+                with connexion:
+                    self._ecrire_acces(connexion)
+        self.hits += len(trouves)
+        self.misses += len(cles) - len(trouves)
+        return trouves
+
+    def get(self, cle, defaut=None):
+        return self.get_many([cle]).get(cle, defaut)
+
+    def _ecrire_acces(self, connexion):
+        """Écrit les dates d'accès en attente, dans la transaction en cours"""
+        with self._verrou:
+            acces, self._acces = self._acces, dict()
+        connexion.executemany(
+            "UPDATE cache SET acces = ? WHERE cle = ?",
+            [(date, cle) for cle, date in acces.items()],
+        )
+
+    def set_many(self, elements):
+        maintenant = time.time()
+        lignes = [
+            (
+                self._cle(cle),
+                pickle.dumps(valeur, pickle.HIGHEST_PROTOCOL),
+                maintenant,
+                maintenant,
+            )
+            for cle, valeur in elements
+        ]
+        connexion = self._connexion()
+        with connexion:
+            self._ecrire_acces(connexion)
+            connexion.executemany(
+                "INSERT OR REPLACE INTO cache (cle, valeur, cree, acces) "
+                "VALUES (?, ?, ?, ?)",
+                lignes,
+            )
+        self._ecritures += len(lignes)
+        # éviction par paquets, pour ne pas compter les lignes à chaque écriture
+        if self._ecritures >= max(1, self.maxsize // 10):
+            self._ecritures = 0
+            self.evincer()
+
+    def set(self, cle, valeur):
+        self.set_many([(cle, valeur)])
+
+    def evincer(self):
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà
+        de maxsize"""
+        connexion = self._connexion()
+        with connexion:
+            self._ecrire_acces(connexion)
+            if self.ttl is not None:
+                connexion.execute(
+                    "DELETE FROM cache WHERE cree < ?", (time.time() - self.ttl,)
+                )
+            connexion.execute(
+                "DELETE FROM cache WHERE cle IN (SELECT cle FROM cache "
+                "ORDER BY acces DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def clear(self):
+        connexion = self._connexion()
+        with connexion:
+            connexion.execute("DELETE FROM cache")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._connexion().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __contains__(self, cle):
+        return cle in self.get_many([cle])
+
+
+class CacheEnCouches:
+    """Enchaîne des caches, du plus rapide au plus partagé (LRUCache en mémoire puis
+    SQLiteCache) : une valeur trouvée dans une couche est recopiée dans les couches
+    précédentes, une nouvelle valeur est écrite dans toutes"""
+
+    def __init__(self, *couches):
+        self.couches = couches
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cle, defaut=None):
+        for i, couche in enumerate(self.couches):
+            valeur = couche.get(cle)
+            if valeur is not None:
+                for precedente in self.couches[:i]:
+                    precedente.set(cle, valeur)
+                self.hits += 1
+                return valeur
+        self.misses += 1
+        return defaut
+
+    def set(self, cle, valeur):
+        for couche in self.couches:
+            couche.set(cle, valeur)
+
+    def clear(self, toutes=False):
+        """Vide la première couche, locale au processus. toutes=True vide aussi les
+        suivantes, dont le cache partagé par tous les processus"""
+        for couche in self.couches if toutes else self.couches[:1]:
+            couche.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.couches[0])
+
+    def __contains__(self, cle):
+        return any(cle in couche for couche in self.couches)
+
+
+def evaluer_avec_cache(params, cache, evaluer_lot):
+    """params : matrice (N, n_vars). Les lignes déjà présentes dans cache (un
+    SQLiteCache) sont relues, les autres évaluées en un lot par evaluer_lot, qui
+    renvoie une valeur par ligne, puis ajoutées au cache.
+    Renvoie la liste des N valeurs"""
+
+    cles = [cle_sliders(ligne) for ligne in params]
+    trouves = cache.get_many(cles)
+    manquantes = [i for i, cle in enumerate(cles) if cle not in trouves]
+    if manquantes:
+        nouvelles = evaluer_lot(params[manquantes])
+        trouves.update(zip((cles[i] for i in manquantes), nouvelles))
+        cache.set_many((cles[i], trouves[cles[i]]) for i in manquantes)
+    return [trouves[cle] for cle in cles]
@@ -0,0 +1,131 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from model import CODES_MALADIES, NOEUDS, ORDRE, PREVALENCES, TERMES, VARIABLES
+from model import compile_model, default_positions, params_from_df
+
+
+class Dual:
+    """Nombre dual d'ordre 2 : valeur, dérivées premières et dérivées secondes
+    diagonales par rapport à chaque variable du modèle (vecteurs de taille k)"""
+
+    __slots__ = ("val", "d1", "d2")
+
+    def __init__(self, val, d1, d2):
+        self.val = val
+        self.d1 = d1
+        self.d2 = d2
+
+    def __add__(self, autre):
+        if isinstance(autre, Dual):
+            return Dual(self.val + autre.val, self.d1 + autre.d1, self.d2 + autre.d2)
+        return Dual(self.val + autre, self.d1, self.d2)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Dual(-self.val, -self.d1, -self.d2)
+
+    def __sub__(self, autre):
+        return self + (-autre)
+
+    def __rsub__(self, autre):
+        return -self + autre
+
+    def __mul__(self, autre):
+        if isinstance(autre, Dual):
+            return Dual(
+                self.val * autre.val,
+                self.d1 * autre.val + self.val * autre.d1,
+                self.d2 * autre.val + 2 * self.d1 * autre.d1 + self.val * autre.d2,
+            )
+        return Dual(self.val * autre, self.d1 * autre, self.d2 * autre)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, autre):
+        if isinstance(autre, Dual):
+            # f / g = f * (1 / g), avec (1/g)' = -g'/g² et (1/g)'' = 2g'²/g³ - g''/g²
+            inverse = Dual(
+                1 / autre.val,
+                -autre.d1 / autre.val ** 2,
+                2 * autre.d1 ** 2 / autre.val ** 3 - autre.d2 / autre.val ** 2,
+            )
+            return self * inverse
+        return Dual(self.val / autre, self.d1 / autre, self.d2 / autre)
+
+
+def _total_dual(x):
+    """Coût total par naissance en nombres duaux, x : valeurs des alias de VARIABLES.
+    Les coûts par cas ne sont pas tronqués à l'euro : la troncature a une dérivée
+    nulle presque partout et masquerait l'effet de chaque variable"""
+
+    directions = np.eye(len(x))
+    valeurs = {
+        alias: Dual(valeur, direction, np.zeros(len(x)))
+        for alias, valeur, direction in zip(VARIABLES, x, directions)
+    }
+    for nom in ORDRE:
+        entrees, fonction = NOEUDS[nom]
+        valeurs[nom] = fonction(*[valeurs[entree] for entree in entrees])
+
+    total = 0.0
+    for maladie, prevalence in zip(CODES_MALADIES, PREVALENCES):
+        cout = 0.0
+        for terme, (maladie_terme, _, _) in TERMES.items():
+            if maladie_terme == maladie:
+                cout = cout + valeurs[terme]
+        total = total + cout * valeurs[prevalence] / 100
+    return total
+
+
+def gradient(params, positions=None):
+    """Coût total par naissance (non tronqué), son gradient et la diagonale de sa
+    hessienne par rapport à chaque paramètre (n_vars,), en une seule évaluation.
+    Les paramètres absents des formules ont des dérivées nulles"""
+
+    if positions is None:
+        positions = default_positions()
+
+    params = np.asarray(params, dtype=np.float64)
+    total = _total_dual(params[positions].tolist())
+
+    derivees = np.zeros(params.shape[-1])
+    derivees_secondes = np.zeros(params.shape[-1])
+    derivees[positions] = total.d1
+    derivees_secondes[positions] = total.d2
+    return total.val, derivees, derivees_secondes
+
+
+def elasticites(df_variables, params=None):
+    """Dérivée, élasticité (variation relative du coût par naissance pour 1 % de
+    variation de la variable) et dérivée seconde de chaque variable, au point params
+    (valeurs de la dernière colonne de df_variables par défaut)"""
+
+    if params is None:
+        params = params_from_df(df_variables)
+
+    total, derivees, derivees_secondes = gradient(params, compile_model(df_variables))
+    return pd.DataFrame(
+        {
+            "Valeur": params,
+            "Dérivée": derivees,
+            "Élasticité": derivees * params / total,
+            "Dérivée seconde": derivees_secondes,
+        },
+        index=df_variables["nom_variable"].values,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Dérivées et élasticités du coût total par naissance"
+    )
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    args = parser.parse_args()
+
+    resultat = elasticites(pd.read_csv(args.variables))
+    ordre = resultat["Élasticité"].abs().sort_values(ascending=False).index
+    print(resultat.loc[ordre].to_string())
@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import flask
+
+
+BORNES_DUREE = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+BORNES_TAILLE = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# métriques exposées par /metrics, dans l'ordre d'enregistrement
+REGISTRE = []
+
+
+def _format(valeur):
+    return repr(float(valeur)) if valeur != float("inf") else "+Inf"
+
+
+def _echapper(texte):
+    return str(texte).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogramme:
+    """Histogramme au format Prometheus, avec une étiquette (une série par valeur).
+    observer est thread-safe : le serveur peut traiter plusieurs requêtes à la fois"""
+
+    def __init__(self, nom, aide, bornes, etiquette):
+        self.nom = nom
+        self.aide = aide
+        self.bornes = tuple(bornes)
+        self.etiquette = etiquette
+        # valeur d'étiquette -> [comptes par seau (+Inf compris), somme]
+        self._series = dict()
+        self._verrou = threading.Lock()
+        REGISTRE.append(self)
+
+    def observer(self, valeur, label):
+        seau = bisect.bisect_left(self.bornes, valeur)
+        with self._verrou:
+            serie = self._series.get(label)
+            if serie is None:
+                serie = self._series[label] = [[0] * (len(self.bornes) + 1), 0.0]
+            serie[0][seau] += 1
+            serie[1] += valeur
+
+    @contextmanager
+    def chrono(self, label):
+        """Observe la durée du bloc, en secondes"""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(time.perf_counter() - debut, label)
+
+    def lignes(self):
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} histogram"
+        with self._verrou:
+            series = [
+                (label, list(comptes), somme)
+                for label, (comptes, somme) in self._series.items()
+            ]
+        for label, comptes, somme in series:
+            etiquette = f'{self.etiquette}="{_echapper(label)}"'
+            cumul = 0
+            for borne, compte in zip(self.bornes + (float("inf"),), comptes):
+                cumul += compte
+                yield f'{self.nom}_bucket{{{etiquette},le="{_format(borne)}"}} {cumul}'
+            yield f"{self.nom}_sum{{{etiquette}}} {somme!r}"
+            yield f"{self.nom}_count{{{etiquette}}} {cumul}"
+
+
+class Jauge:
+    """Valeur lue au moment de l'exposition (taille d'un cache, compteur de hits...)"""
+
+    def __init__(self, nom, aide, fonction, type_metrique="gauge"):
+        self.nom = nom
+        self.aide = aide
+        self.fonction = fonction
+        self.type_metrique = type_metrique
+        REGISTRE.append(self)
+
+    def lignes(self):
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} {self.type_metrique}"
+        yield f"{self.nom} {self.fonction()!r}"
+
+
+def exposer():
+    """Toutes les métriques au format texte de Prometheus"""
+    lignes = [ligne for metrique in REGISTRE for ligne in metrique.lignes()]
+    return "\n".join(lignes) + "\n"
+
+
+DUREE_ETAPES = Histogramme(
+    "psython_compute_costs_etape_secondes",
+    "Durée de chaque étape de compute_costs",
+    BORNES_DUREE,
+    "etape",
+)
+DUREE_CALLBACKS = Histogramme(
+    "psython_callback_secondes",
+    "Durée de traitement de chaque callback Dash côté serveur",
+    BORNES_DUREE,
+    "callback",
+)
+TAILLE_CALLBACKS = Histogramme(
+    "psython_callback_octets",
+    "Taille de la réponse de chaque callback Dash",
+    BORNES_TAILLE,
+    "callback",
+)
+
+
+def instrumenter(server, route="/metrics"):
+    """Mesure durée et taille de réponse de chaque callback Dash
+    (/_dash-update-component) et expose les métriques sur route"""
+
+    @server.before_request
+    def _debut_callback():
+        if flask.request.path.endswith("/_dash-update-component"):
+            flask.g.debut_callback = time.perf_counter()
+
+    @server.after_request
+    def _fin_callback(response):
+        debut = flask.g.pop("debut_callback", None)
+        if debut is not None:
+            corps = flask.request.get_json(silent=True) or dict()
+            callback = corps.get("output", "inconnu")
+            DUREE_CALLBACKS.observer(time.perf_counter() - debut, callback)
+            taille = response.calculate_content_length()
+            if taille is None:
+                taille = len(response.get_data())
+            TAILLE_CALLBACKS.observer(taille, callback)
+        return response
+
+    @server.route(route)
+    def _metrics():
+        return flask.Response(exposer(), mimetype="text/plain; version=0.0.4")
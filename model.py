@@ -1,645 +1,752 @@
-import pandas as pd
+import hashlib
+import inspect
+import logging
+import re
+
+# pandas n'est importé que dans default_positions et tableaux : les calculs du modèle
+# n'en ont pas besoin, et son import coûte plusieurs fois celui de numpy
 import numpy as np
+from functools import lru_cache
+
+from profilage import profile
+
+logger = logging.getLogger(__name__)
+
+# Durée légale du travail, pour passer du revenu horaire au revenu hebdomadaire
+HEURES_PAR_SEMAINE = 35
+
+
+# DEFINITION DU MODELE
+# Variables, termes de coût et rattachement de chaque terme à une maladie, une
+# personne et un secteur sont définis une seule fois ici : tableaux par cas, coûts
+# par naissance, répartition par secteur et calculs vectorisés en dérivent tous.
+# Les formules sont évaluées sur un vecteur de paramètres float64 dont les
+# positions sont résolues une seule fois (voir compile_model).
+
+VARIABLES = {
+    # ANXIETE BEBE
+    "cout_sp_naissance_prematuree": "Coût pour le service public d'une naissance prématurée",
+    "risque_prematuree_anxiete": "Risque suppl. de naissance prématurée en cas d'anxiété",
+    "cout_emotionnel_anxiete": "Coût des problèmes émotionnels en cas d'anxiété",
+    "risque_comportement_anxiete": "Risque supplémentaire de troubles du comportement",
+    "cout_sp_douleur_abdo": "Coût pour le service public de douleur abdominale chronique pédiatrique par an",
+    "risque_douleur_abdo": "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
+    "duree_douleur_abdo": "Durée moyenne des douleurs abdominales chroniques en année",
+    "cout_educ_anxiete": "Coût lié aux problèmes émotionnels si anxiété",
+    "qaly_anxiete_bebe": "Coût de perte de qualité de vie si anxiété (en QALY)",
+    "qaly_emotionnel_anxiete": "Coûts des problème emotionnels (en QALY)",
+    "qaly_comportement_anxiete": "Coûts des troubles du comportement par cas (en QALY)",
+    "perte_prod_emotionnel_anxiete": "Coût de pertes de productivité liées aux problèmes émotionnels",
+    "perte_prod_douleur_abdo": "Coût lié aux douleurs abdominales chroniques",
+    "unpaid_care_douleur_abdo": "Coût unpaid care douleurs abdo chroniques",
+    "out_of_pocket_douleur_abdo": "Coût out-of-pocket lié douleurs abdo chroniques",
+    "cout_secu_comportement": "Coût pour la Sécu des troubles du comportement par cas",
+    "cout_justice_comportement": "Coût pour la justice des troubles du comportement par cas",
+    # ANXIETE MERE
+    "cout_annuel_anxiete": "Coût attribuable à l'anxiété périnat par femme chaque année",
+    "duree_anxiete": "Durée moyenne de l'anxiété",
+    "perte_qdv_anxiete": "Perte de qualité de vie pour la mère en cas d'anxiété",
+    "semaines_perdues_anxiete": "Nombre de semaines de travail perdues chaque année",
+    # DEPRESSION BEBE
+    "cout_secu_prematuree_depression": "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle",
+    "proba_comportement_depression": "Probabilité supplémentaire de troubles du comportement",
+    "cout_emotionnel_depression": "Coût des problèmes émotionnels pour le bébé",
+    "cout_educ_depression": "Coûts supplémentaires pour l'éducation",
+    "proba_mort_enfant_depression": "Probabilité supplémentaire de mort de l'enfant",
+    "qaly_emotionnel_depression": "Coûts supplémentaires des problèmes émotionnels (en QALY)",
+    "perte_prod_abandon_ecole": "Coût lié à l'abandon de l'école sans qualification",
+    "perte_qdv_comportement": "Perte de qualité vie due à des troubles du comportement (en QALY)",
+    "cout_justice_depression": "Coût total pour la justice",
+    "perte_prod_comportement": "Coût en perte de productivité des troubles du comportement par cas",
+    "cout_victimes_comportement": "Coût suppl total pour victimes crimes et délits par cas",
+    "perte_prod_emotionnel_depression": "Coût en perte de productivité des problèmes émotionnels",
+    # DEPRESSION MERE
+    "cout_sp_depression": "Coûts attribuables à dépréssion périnatale pour le secteur public",
+    "duree_depression": "Durée moyenne d'une dépréssion périnatale",
+    "perte_qdv_depression": "Indice de perte de qualité de vie pour la dépression",
+    "semaines_perdues_depression": "Réduction des semaines de travail chaque année",
+    # ECONOMIQUE
+    "valeur_qaly": "Valeur d'une année de QALY",
+    "prix_vie": "Prix d'une vie",
+    "revenu_horaire_femme": "Revenu horaire moyen d'une femme",
+    # MEDICAL
+    "prevalence_depression": "Prévalence de la dépression",
+    "prevalence_anxiete": "Prévalence de l'anxiété",
+    "prevalence_psychose": "Prévalence de la psychose",
+    "risque_prematuree_psychose": "Risque supplémentaire de naissance prématurée",
+    "risque_mort_enfant_psychose": "Risque supplémentaire de mort de l'enfant",
+    # PSYCHOSE MERE
+    "cout_secu_psychose": "Coût pour la Sécu d'une psychose",
+    "perte_qdv_psychose": "Perte de qualité de vie pour une psychose",
+    "duree_psychose": "Durée moyenne d'une psychose",
+    "risque_suicide_psychose": "Risque supplémentaire de suicide en cas de psychose",
+    "part_schizophrenie": "Pourcentage de schizophrènes parmi psychose",
+    "perte_prod_schizophrenie": "Perte de productivité en cas d'épisode de schizophrènie",
+    "unpaid_care_schizophrenie": "Coût unpaid care en cas de schizophrénie",
+}
+# alias -> rang dans VARIABLES, donc dans le vecteur renvoyé par compile_model
+INDICES_VARIABLES = {alias: i for i, alias in enumerate(VARIABLES)}
+
+MALADIES = ["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"]
+PERSONNES = ["Mère", "Bébé", "Total"]
+SECTEURS = [
+    "Santé et social",
+    "Secteur public <br>(éducation, justice, etc.)",
+    "Société entière<br>(perte de chance, <br>de qualité de vie, <br>de productivité, etc.)",
+]
+# mêmes libellés sans balises HTML, pour les exports
+SECTEURS_TEXTE = [re.sub(r"\s*<br>\s*", " ", secteur) for secteur in SECTEURS]
+
+CODES_MALADIES = ["depression", "anxiete", "psychose"]
+CODES_PERSONNES = ["mere", "bebe"]
+CODES_SECTEURS = ["sante_social", "service_public", "societe"]
+
+
+def revenu_hebdo_femme(revenu_horaire):
+    """Revenu hebdomadaire moyen d'une femme après la naissance : taux d'emploi
+    avant la naissance, de reprise d'emploi et de temps de travail appliqués"""
+    return revenu_horaire * HEURES_PAR_SEMAINE * 0.74 * 0.75 * 0.60
+
 
 def val(df, col):
-    return df.loc[col][-1]
+    """Valeur courante (dernière colonne) de la variable col, df indexé par
+    nom_variable"""
+    return df.loc[col].iloc[-1]
 
 
 def get_revenu_moyen_femme(df):
-    """return (
-        val(df, "Revenu hebdomadaire moyen d'une femme")
-        * val(df, "Part des femmes employées avant la naissance")
-        / 100
-        * val(df, "Part des femmes reprenant un emploi après la naissance")
-        / 100
-        * ((val(df, "Part des femmes reprenant à plein temps") / 100) + 1)
-        * 0.5
-    )"""
+    """revenu_hebdo_femme du revenu horaire moyen d'une femme lu dans df_variables,
+    indexé ou non par nom_variable"""
+    if "nom_variable" in df.columns:
+        df = df.set_index("nom_variable")
+    return revenu_hebdo_femme(val(df, VARIABLES["revenu_horaire_femme"]))
 
-    return (
-        val(df, "Revenu hebdomadaire moyen d'une femme")
-        * 0.74
-        * 0.75
-        * 0.60
+
+def compile_model(df_variables):
+    """Résout la position de chaque variable du modèle dans df_variables.
+    Renvoie un vecteur d'indices, à calculer une seule fois par table de variables"""
+
+    if "nom_variable" in df_variables.columns:
+        noms = df_variables["nom_variable"]
+    else:
+        noms = df_variables.index
+
+    positions = {nom: i for i, nom in enumerate(noms)}
+    return np.array([positions[nom] for nom in VARIABLES.values()], dtype=np.intp)
+
+
+def signature_modele(positions):
+    """Empreinte des formules (source de ce fichier) et des positions des variables :
+    des résultats enregistrés sous une autre empreinte ne sont plus valables"""
+    empreinte = hashlib.sha1()
+    with open(__file__, "rb") as f:
+        empreinte.update(f.read())
+    empreinte.update(np.asarray(positions, dtype=np.int64).tobytes())
+    return empreinte.hexdigest()
+
+
+def params_from_df(df_variables):
+    """Vecteur float64 des valeurs courantes (dernière colonne de df_variables)"""
+    return df_variables.iloc[:, -1].to_numpy(dtype=np.float64)
+
+
+# GRAPHE DE CALCUL
+# Chaque terme de coût est un nœud dont les entrées sont les noms de ses arguments :
+# des alias de VARIABLES ou d'autres nœuds. Quand une variable change, seuls les
+# nœuds en aval sont à recalculer (voir ModeleIncremental).
+
+# nœud -> (entrées, fonction)
+NOEUDS = dict()
+
+
+def noeud(fonction):
+    """Déclare un nœud du graphe, nommé comme la fonction"""
+    NOEUDS[fonction.__name__] = (
+        tuple(inspect.signature(fonction).parameters),
+        fonction,
     )
+    return fonction
 
 
-def process_values(df_variables, depression=True, anxiete=True, psychose=True):
+@noeud
+def revenu_hebdo(revenu_horaire_femme):
+    return revenu_hebdo_femme(revenu_horaire_femme)
 
-    if "nom_variable" in df_variables.columns:
-        df_variables = df_variables.set_index("nom_variable")
 
-    revenu_moyen_hebdo_femme_post_naissance = get_revenu_moyen_femme(df_variables)
-    print(revenu_moyen_hebdo_femme_post_naissance)
+# DEPRESSION MERE
+@noeud
+def cdmsp_sante_social(cout_sp_depression):
+    return cout_sp_depression
 
-    if depression:
-        # DEPRESSION MERE
-        cdmsp_sante_social = val(
-            df_variables,
-            "Coûts attribuables à dépréssion périnatale pour le secteur public",
-        )
-        cdmsoc_qaly = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Indice de perte de qualité de vie pour la dépression")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
 
-        cdmsoc_perte_prod = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Réduction des semaines de travail chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-        )
+@noeud
+def cdmsoc_qaly(duree_depression, perte_qdv_depression, valeur_qaly):
+    return duree_depression * perte_qdv_depression * valeur_qaly
 
-        # DEPRESSION BEBE
-        # Secteur Public
-        cdbsp_sante_social = (
-            val(df_variables, "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle")
-            + val(df_variables, "Coût des problèmes émotionnels pour le bébé")
-            + (
-                val(
-                    df_variables, "Probabilité supplémentaire de troubles du comportement"
-                )
-                / 100
-            )
-            * val(df_variables, "Coût pour la Sécu des troubles du comportement par cas")
-        )
 
-        cdbsp_educ = val(df_variables, "Coûts supplémentaires pour l'éducation")
-        cdbsp_justice = val(df_variables, "Coût total pour la justice")
+@noeud
+def cdmsoc_perte_prod(duree_depression, semaines_perdues_depression, revenu_hebdo):
+    return duree_depression * semaines_perdues_depression * revenu_hebdo
 
-        # Société
-        cdbsoc_qaly = (
-            - 0
-            - 0
-            + val(
-                df_variables,
-                "Perte de qualité vie due à des troubles du comportement (en QALY)",
-            )
-            * val(df_variables, "Valeur d'une année de QALY")
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-            + val(
-                df_variables, "Coûts supplémentaires des problèmes émotionnels (en QALY)"
-            )
-            + val(df_variables, "Probabilité supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-        )
 
-        cdbsoc_perte_prod = (
-            val(df_variables, "Coût en perte de productivité des problèmes émotionnels")
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-            + val(df_variables, "Coût lié à l'abandon de l'école sans qualification")
-        )
+# DEPRESSION BEBE
+@noeud
+def cdbsp_sante_social(
+    cout_secu_prematuree_depression,
+    cout_emotionnel_depression,
+    proba_comportement_depression,
+    cout_secu_comportement,
+):
+    return (
+        cout_secu_prematuree_depression
+        + cout_emotionnel_depression
+        + (proba_comportement_depression / 100) * cout_secu_comportement
+    )
 
-        cdbsoc_autres = (
-            val(df_variables, "Coût suppl total pour victimes crimes et délits par cas")
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-        )
 
-    if anxiete:
-        # ANXIETE MERE
-        camsp_sante_social = val(
-            df_variables, "Coût attribuable à l'anxiété périnat par femme chaque année"
-        ) * val(df_variables, "Durée moyenne de l'anxiété")
+@noeud
+def cdbsp_educ(cout_educ_depression):
+    return cout_educ_depression
 
-        camsoc_qaly = (
-            val(df_variables, "Perte de qualité de vie pour la mère en cas d'anxiété")
-            * val(df_variables, "Durée moyenne de l'anxiété")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
 
-        camsoc_perte_prod = (
-            val(df_variables, "Nombre de semaines de travail perdues chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-            * val(df_variables, "Durée moyenne de l'anxiété")
-        )
+@noeud
+def cdbsp_justice(cout_justice_depression):
+    return cout_justice_depression
 
-        # ANXIETE BEBE
-        cabsp_sante_social = (
-            val(df_variables, "Coût pour le service public d'une naissance prématurée")
-            * val(
-                df_variables, "Risque suppl. de naissance prématurée en cas d'anxiété"
-            )
-            / 100
-            + val(df_variables, "Coût des problèmes émotionnels en cas d'anxiété")
-            + val(df_variables, "Coût pour la Sécu des troubles du comportement par cas")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(
-                df_variables,
-                "Coût pour le service public de douleur abdominale chronique pédiatrique par an",
-            )
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
 
-        cabsp_educ = val(df_variables, "Coût lié aux problèmes émotionnels si anxiété")
+@noeud
+def cdbsoc_qaly(
+    perte_qdv_comportement,
+    valeur_qaly,
+    proba_comportement_depression,
+    qaly_emotionnel_depression,
+    proba_mort_enfant_depression,
+    prix_vie,
+):
+    return (
+        perte_qdv_comportement * valeur_qaly * proba_comportement_depression / 100
+        + qaly_emotionnel_depression
+        + proba_mort_enfant_depression / 100 * prix_vie * 1e6
+    )
 
-        cabsp_justice = (
-            val(df_variables, "Coût pour la justice des troubles du comportement par cas")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
 
-        cabsoc_qaly = (
-            val(df_variables, "Coût de perte de qualité de vie si anxiété (en QALY)")
-            + val(df_variables, "Coûts des problème emotionnels (en QALY)")
-            + val(df_variables, "Coûts des troubles du comportement par cas (en QALY)")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
+@noeud
+def cdbsoc_perte_prod(
+    perte_prod_emotionnel_depression,
+    perte_prod_comportement,
+    proba_comportement_depression,
+    perte_prod_abandon_ecole,
+):
+    return (
+        perte_prod_emotionnel_depression
+        + perte_prod_comportement * proba_comportement_depression / 100
+        + perte_prod_abandon_ecole
+    )
 
-        cabsoc_perte_prod = (
-            val(
-                df_variables,
-                "Coût de pertes de productivité liées aux problèmes émotionnels",
-            )
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(df_variables, "Coût lié aux douleurs abdominales chroniques")
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
 
-        cabsoc_autres = val(
-            df_variables, "Coût suppl total pour victimes crimes et délits par cas"
-        ) * val(
-            df_variables, "Risque supplémentaire de troubles du comportement"
-        ) / 100 + (
-            val(df_variables, "Coût unpaid care douleurs abdo chroniques")
-            + val(df_variables, "Coût out-of-pocket lié douleurs abdo chroniques")
-        ) * val(
-            df_variables,
-            "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-        ) / 100 * val(
-            df_variables, "Durée moyenne des douleurs abdominales chroniques en année"
-        )
+@noeud
+def cdbsoc_autres(cout_victimes_comportement, proba_comportement_depression):
+    return cout_victimes_comportement * proba_comportement_depression / 100
 
-    if psychose:
-        # PSYCHOSE MERE
-        cpmsp_sante_social = val(df_variables, "Coût pour la Sécu d'une psychose")
-
-        cpmsoc_qaly = val(
-            df_variables, "Risque supplémentaire de suicide en cas de psychose"
-        ) / 100 * val(df_variables, "Prix d'une vie") * int(1e6) + val(
-            df_variables, "Perte de qualité de vie pour une psychose"
-        ) * val(
-            df_variables, "Durée moyenne d'une psychose"
-        ) * val(
-            df_variables, "Valeur d'une année de QALY"
-        )
 
-        cpmsoc_perte_prod = (
-            val(df_variables, "Perte de productivité en cas d'épisode de schizophrènie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
+# ANXIETE MERE
+@noeud
+def camsp_sante_social(cout_annuel_anxiete, duree_anxiete):
+    return cout_annuel_anxiete * duree_anxiete
 
-        cpmsoc_autres = (
-            val(df_variables, "Coût unpaid care en cas de schizophrénie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
 
-        # PSYCHOSE BEBE
-        cpbsp_sante_social = (
-            val(df_variables, "Risque supplémentaire de naissance prématurée")
-            / 100
-            * val(
-                df_variables, "Coût pour le service public d'une naissance prématurée"
-            )
-        )
+@noeud
+def camsoc_qaly(perte_qdv_anxiete, duree_anxiete, valeur_qaly):
+    return perte_qdv_anxiete * duree_anxiete * valeur_qaly
 
-        cpbsoc_qaly = (
-            val(df_variables, "Risque supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
 
-    # COUT DEPRESSION
-    cout_depression_mere_SP = cdmsp_sante_social
-    cout_depression_mere_SOC = cdmsoc_qaly + cdmsoc_perte_prod
-
-    cout_depression_bebe_SP = cdbsp_sante_social + cdbsp_educ + cdbsp_justice
-    cout_depression_bebe_SOC = cdbsoc_qaly + cdbsoc_perte_prod + cdbsoc_autres
-
-    # COUT ANXIETE
-    cout_anxiete_mere_SP = camsp_sante_social
-    cout_anxiete_mere_SOC = camsoc_qaly + camsoc_perte_prod
-
-    cout_anxiete_bebe_SP = cabsp_sante_social + cabsp_educ + cabsp_justice
-    cout_anxiete_bebe_SOC = cabsoc_qaly + cabsoc_perte_prod + cabsoc_autres
-
-    # COUT PSYCHOSE
-    cout_psychose_mere_SP = cpmsp_sante_social
-    cout_psychose_mere_SOC = cpmsoc_qaly + cpmsoc_perte_prod + cpmsoc_autres
-
-    cout_psychose_bebe_SP = cpbsp_sante_social
-    cout_psychose_bebe_SOC = cpbsoc_qaly
-
-    # COUT PAR MALADIE
-    cout_depression_mere = int(cout_depression_mere_SP + cout_depression_mere_SOC)
-    cout_depression_bebe = int(cout_depression_bebe_SP + cout_depression_bebe_SOC)
-
-    cout_anxiete_mere = int(cout_anxiete_mere_SP + cout_anxiete_mere_SOC)
-    cout_anxiete_bebe = int(cout_anxiete_bebe_SP + cout_anxiete_bebe_SOC)
-
-    cout_psychose_mere = int(cout_psychose_mere_SP + cout_psychose_mere_SOC)
-    cout_psychose_bebe = int(cout_psychose_bebe_SP + cout_psychose_bebe_SOC)
-
-    # TOTAL PAR MALADIE
-    cout_depression = cout_depression_mere + cout_depression_bebe
-    cout_anxiete = cout_anxiete_mere + cout_anxiete_bebe
-    cout_psychose = cout_psychose_mere + cout_psychose_bebe
-
-    couts = [
-        [
-            cout_depression_mere,
-            cout_depression_bebe,
-            cout_depression_mere + cout_depression_bebe,
-        ],
-        [cout_anxiete_mere, cout_anxiete_bebe, cout_anxiete_mere + cout_anxiete_bebe],
-        [
-            cout_psychose_mere,
-            cout_psychose_bebe,
-            cout_psychose_mere + cout_psychose_bebe,
-        ],
-    ]
+@noeud
+def camsoc_perte_prod(semaines_perdues_anxiete, revenu_hebdo, duree_anxiete):
+    return semaines_perdues_anxiete * revenu_hebdo * duree_anxiete
 
-    df_par_cas = pd.DataFrame(
-        couts,
-        columns=["Mère", "Bébé", "Total"],
-        index=["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"],
+
+# ANXIETE BEBE
+@noeud
+def cabsp_sante_social(
+    cout_sp_naissance_prematuree,
+    risque_prematuree_anxiete,
+    cout_emotionnel_anxiete,
+    cout_secu_comportement,
+    risque_comportement_anxiete,
+    cout_sp_douleur_abdo,
+    risque_douleur_abdo,
+    duree_douleur_abdo,
+):
+    return (
+        cout_sp_naissance_prematuree * risque_prematuree_anxiete / 100
+        + cout_emotionnel_anxiete
+        + cout_secu_comportement * risque_comportement_anxiete / 100
+        + cout_sp_douleur_abdo * risque_douleur_abdo / 100 * duree_douleur_abdo
     )
 
-    # Calcul de la répartition des dépenses en fonction du secteur
-    total_sante_social = sum(
-        [
-            cdmsp_sante_social,
-            cdbsp_sante_social,
-            camsp_sante_social,
-            cabsp_sante_social,
-            cpmsp_sante_social,
-            cpbsp_sante_social,
-        ]
+
+@noeud
+def cabsp_educ(cout_educ_anxiete):
+    return cout_educ_anxiete
+
+
+@noeud
+def cabsp_justice(cout_justice_comportement, risque_comportement_anxiete):
+    return cout_justice_comportement * risque_comportement_anxiete / 100
+
+
+@noeud
+def cabsoc_qaly(
+    qaly_anxiete_bebe,
+    qaly_emotionnel_anxiete,
+    qaly_comportement_anxiete,
+    risque_comportement_anxiete,
+):
+    return (
+        qaly_anxiete_bebe
+        + qaly_emotionnel_anxiete
+        + qaly_comportement_anxiete * risque_comportement_anxiete / 100
     )
-    total_autre_servicepublic = sum(
-        [cdbsp_educ, cdbsp_justice, cabsp_educ, cabsp_justice]
+
+
+@noeud
+def cabsoc_perte_prod(
+    perte_prod_emotionnel_anxiete,
+    perte_prod_comportement,
+    risque_comportement_anxiete,
+    perte_prod_douleur_abdo,
+    risque_douleur_abdo,
+    duree_douleur_abdo,
+):
+    return (
+        perte_prod_emotionnel_anxiete
+        + perte_prod_comportement * risque_comportement_anxiete / 100
+        + perte_prod_douleur_abdo * risque_douleur_abdo / 100 * duree_douleur_abdo
     )
-    total_societe_entiere = sum(
-        [
-            cout_depression_mere_SOC,
-            cout_depression_bebe_SOC,
-            cout_anxiete_mere_SOC,
-            cout_anxiete_bebe_SOC,
-            cout_psychose_mere_SOC,
-            cout_psychose_bebe_SOC,
-        ]
+
+
+@noeud
+def cabsoc_autres(
+    cout_victimes_comportement,
+    risque_comportement_anxiete,
+    unpaid_care_douleur_abdo,
+    out_of_pocket_douleur_abdo,
+    risque_douleur_abdo,
+    duree_douleur_abdo,
+):
+    return (
+        cout_victimes_comportement * risque_comportement_anxiete / 100
+        + (unpaid_care_douleur_abdo + out_of_pocket_douleur_abdo)
+        * risque_douleur_abdo
+        / 100
+        * duree_douleur_abdo
     )
 
-    total_secteurs = (
-        total_sante_social + total_autre_servicepublic + total_societe_entiere
+
+# PSYCHOSE MERE
+@noeud
+def cpmsp_sante_social(cout_secu_psychose):
+    return cout_secu_psychose
+
+
+@noeud
+def cpmsoc_qaly(
+    risque_suicide_psychose, prix_vie, perte_qdv_psychose, duree_psychose, valeur_qaly
+):
+    return (
+        risque_suicide_psychose / 100 * prix_vie * 1e6
+        + perte_qdv_psychose * duree_psychose * valeur_qaly
     )
 
-    repartition = {
-        "Santé et social": int(total_sante_social) / total_secteurs,
-        "Secteur public <br>(éducation, justice, etc.)": int(total_autre_servicepublic) / total_secteurs,
-        "Société entière<br>(perte de chance, <br>de qualité de vie, <br>de productivité, etc.)": int(total_societe_entiere) / total_secteurs,
-    }
 
-    df_repartition_secteur = pd.DataFrame(repartition, index=["Répartition des coûts par secteur"]).T
+@noeud
+def cpmsoc_perte_prod(perte_prod_schizophrenie, part_schizophrenie):
+    return perte_prod_schizophrenie * part_schizophrenie / 100
+
 
-    return df_par_cas, df_repartition_secteur
+@noeud
+def cpmsoc_autres(unpaid_care_schizophrenie, part_schizophrenie):
+    return unpaid_care_schizophrenie * part_schizophrenie / 100
 
 
+# PSYCHOSE BEBE
+@noeud
+def cpbsp_sante_social(risque_prematuree_psychose, cout_sp_naissance_prematuree):
+    return risque_prematuree_psychose / 100 * cout_sp_naissance_prematuree
+
+
+@noeud
+def cpbsoc_qaly(risque_mort_enfant_psychose, prix_vie, part_schizophrenie):
+    return risque_mort_enfant_psychose / 100 * prix_vie * 1e6 * part_schizophrenie / 100
 
 
+def _ordre_topologique():
+    ordre, vus = [], set(VARIABLES)
+
+    def visiter(nom, chemin=()):
+        if nom in vus:
+            return
+        if nom not in NOEUDS:
+            raise ValueError(f"Entrée inconnue dans le graphe du modèle : {nom}")
+        if nom in chemin:
+            raise ValueError(f"Cycle dans le graphe du modèle : {chemin + (nom,)}")
+        for entree in NOEUDS[nom][0]:
+            visiter(entree, chemin + (nom,))
+        vus.add(nom)
+        ordre.append(nom)
+
+    for nom in NOEUDS:
+        visiter(nom)
+    return ordre
+
+
+ORDRE = _ordre_topologique()
+
+
+@lru_cache(maxsize=None)
+def noeuds_en_aval(entrees):
+    """Nœuds à recalculer, dans l'ordre d'évaluation, quand les entrées (tuple
+    d'alias de VARIABLES ou de nœuds) changent"""
+
+    touches = set(entrees)
+    for nom in ORDRE:
+        if not touches.isdisjoint(NOEUDS[nom][0]):
+            touches.add(nom)
+    return tuple(nom for nom in ORDRE if nom in touches and nom in NOEUDS)
+
+
+def _evaluer_noeuds(valeurs, noms=ORDRE):
+    """Évalue les nœuds noms, dans l'ordre, à partir du dict valeurs (complété)"""
+    for nom in noms:
+        entrees, fonction = NOEUDS[nom]
+        valeurs[nom] = fonction(*[valeurs[entree] for entree in entrees])
+    return valeurs
+
+
+def _termes(v):
+    """v : dict alias -> valeur (float ou np.ndarray). Renvoie la valeur de chaque
+    nœud du graphe, dont les termes de coût par cas de TERMES"""
+    return _evaluer_noeuds(dict(v))
+
+
+# terme -> (maladie, personne, secteur), dans l'ordre de sommation
+TERMES = {
+    "cdmsp_sante_social": ("depression", "mere", "sante_social"),
+    "cdmsoc_qaly": ("depression", "mere", "societe"),
+    "cdmsoc_perte_prod": ("depression", "mere", "societe"),
+    "cdbsp_sante_social": ("depression", "bebe", "sante_social"),
+    "cdbsp_educ": ("depression", "bebe", "service_public"),
+    "cdbsp_justice": ("depression", "bebe", "service_public"),
+    "cdbsoc_qaly": ("depression", "bebe", "societe"),
+    "cdbsoc_perte_prod": ("depression", "bebe", "societe"),
+    "cdbsoc_autres": ("depression", "bebe", "societe"),
+    "camsp_sante_social": ("anxiete", "mere", "sante_social"),
+    "camsoc_qaly": ("anxiete", "mere", "societe"),
+    "camsoc_perte_prod": ("anxiete", "mere", "societe"),
+    "cabsp_sante_social": ("anxiete", "bebe", "sante_social"),
+    "cabsp_educ": ("anxiete", "bebe", "service_public"),
+    "cabsp_justice": ("anxiete", "bebe", "service_public"),
+    "cabsoc_qaly": ("anxiete", "bebe", "societe"),
+    "cabsoc_perte_prod": ("anxiete", "bebe", "societe"),
+    "cabsoc_autres": ("anxiete", "bebe", "societe"),
+    "cpmsp_sante_social": ("psychose", "mere", "sante_social"),
+    "cpmsoc_qaly": ("psychose", "mere", "societe"),
+    "cpmsoc_perte_prod": ("psychose", "mere", "societe"),
+    "cpmsoc_autres": ("psychose", "mere", "societe"),
+    "cpbsp_sante_social": ("psychose", "bebe", "sante_social"),
+    "cpbsoc_qaly": ("psychose", "bebe", "societe"),
+}
+
+
+def _somme(valeurs, zero):
+    total = zero
+    for valeur in valeurs:
+        total = total + valeur
+    return total
+
+
+def _agreger(t, maladies=None):
+    """Agrège les termes selon TERMES en coûts par cas (..., maladie, personne) et en
+    répartition par secteur (..., secteur). maladies : codes des maladies prises en
+    compte (toutes par défaut), les autres comptent pour zéro"""
+
+    if maladies is None:
+        maladies = CODES_MALADIES
+
+    formes = {getattr(t[terme], "shape", ()) for terme in TERMES}
+    if len(formes) > 1:
+        # balayage d'une variable : seuls les termes en aval sont des vecteurs
+        # (broadcast_arrays plutôt que broadcast_shapes, absent de numpy < 1.20)
+        t = dict(zip(TERMES, np.broadcast_arrays(*[t[terme] for terme in TERMES])))
+    zero = 0.0 * t["cdmsp_sante_social"]
+
+    # (maladie, personne, secteur) -> somme des termes
+    groupes = dict()
+    for terme, cle in TERMES.items():
+        if cle[0] in maladies:
+            groupes[cle] = groupes.get(cle, zero) + t[terme]
+
+    def groupe(maladie, personne, secteur):
+        return groupes.get((maladie, personne, secteur), zero)
+
+    def cout(maladie, personne):
+        # service public (santé et social puis éducation, justice...) puis société,
+        # tronqué à l'euro comme les tableaux publiés
+        service_public = _somme(
+            (groupe(maladie, personne, secteur) for secteur in CODES_SECTEURS[:-1]),
+            zero,
+        )
+        return np.trunc(service_public + groupe(maladie, personne, "societe"))
+
+    mere = np.stack([cout(maladie, "mere") for maladie in CODES_MALADIES], axis=-1)
+    bebe = np.stack([cout(maladie, "bebe") for maladie in CODES_MALADIES], axis=-1)
+    couts = np.stack([mere, bebe, mere + bebe], axis=-1)
+
+    totaux = [
+        _somme(
+            (
+                groupe(maladie, personne, secteur)
+                for maladie in CODES_MALADIES
+                for personne in CODES_PERSONNES
+            ),
+            zero,
+        )
+        for secteur in CODES_SECTEURS
+    ]
+    total_secteurs = _somme(totaux, zero)
+    # coûts tous nuls (sliders à zéro) : parts nulles plutôt que 0 / 0
+    total_secteurs = np.where(total_secteurs == 0, 1.0, total_secteurs)
+    repartition = np.stack(
+        [np.trunc(total) / total_secteurs for total in totaux], axis=-1
+    )
 
+    return couts, repartition
 
 
+def evaluate_params(params, positions, maladies=None):
+    """params : vecteur (n_vars,) ou matrice (..., n_vars) au format de bdd_variables
+    positions : sortie de compile_model
+    maladies : codes de CODES_MALADIES à prendre en compte, toutes par défaut
 
-def process_values_sensi(df_variables, depression=True, anxiete=True, psychose=True):
+    Renvoie les coûts par cas (..., 3 maladies, Mère/Bébé/Total) et la répartition
+    par secteur (..., 3 secteurs)"""
 
-    if "nom_variable" in df_variables.columns:
-        df_variables = df_variables.set_index("nom_variable")
+    x = np.asarray(params, dtype=np.float64)[..., positions]
+    colonnes = x.tolist() if x.ndim == 1 else np.moveaxis(x, -1, 0)
+    return _agreger(_termes(dict(zip(VARIABLES, colonnes))), maladies)
 
-    revenu_moyen_hebdo_femme_post_naissance = get_revenu_moyen_femme(df_variables)
 
-    if depression:
-        # DEPRESSION MERE
-        cdmsp_sante_social = val(
-            df_variables,
-            "Coûts attribuables à dépréssion périnatale pour le secteur public",
-        )
-        cdmsoc_qaly = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Indice de perte de qualité de vie pour la dépression")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
+PREVALENCES = ["prevalence_depression", "prevalence_anxiete", "prevalence_psychose"]
 
-        cdmsoc_perte_prod = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Réduction des semaines de travail chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-        )
 
-        # DEPRESSION BEBE
-        # Secteur Public
-        cdbsp_sante_social = (
-            val(df_variables, "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle")
-            + val(df_variables, "Coût des problèmes émotionnels pour le bébé")
-            + (
-                val(
-                    df_variables, "Probabilité supplémentaire de troubles du comportement"
-                )
-                / 100
-            )
-            * val(df_variables, "Coût pour la Sécu des troubles du comportement par cas")
-        )
+@lru_cache(maxsize=None)
+def default_positions(path="bdd_variables.csv"):
+    """Positions des variables du modèle dans le fichier de référence"""
+    import pandas as pd
 
-        cdbsp_educ = val(df_variables, "Coûts supplémentaires pour l'éducation")
-        cdbsp_justice = val(df_variables, "Coût total pour la justice")
+    return compile_model(pd.read_csv(path))
 
-        # Société
-        cdbsoc_qaly = (
-            - 0
-            - 0
-            + val(
-                df_variables,
-                "Perte de qualité vie due à des troubles du comportement (en QALY)",
-            )
-            * val(df_variables, "Valeur d'une année de QALY")
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-            + val(
-                df_variables, "Coûts supplémentaires des problèmes émotionnels (en QALY)"
-            )
-            + val(df_variables, "Probabilité supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-        )
 
-        cdbsoc_perte_prod = (
-            val(df_variables, "Coût en perte de productivité des problèmes émotionnels")
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-            + val(df_variables, "Coût lié à l'abandon de l'école sans qualification")
-        )
+def prevalences_params(params, positions):
+    """Prévalences des 3 maladies (..., 3), en proportion"""
+    idx = [INDICES_VARIABLES[alias] for alias in PREVALENCES]
+    return np.asarray(params, dtype=np.float64)[..., positions[idx]] / 100
 
-        cdbsoc_autres = (
-            val(df_variables, "Coût suppl total pour victimes crimes et délits par cas")
-            * val(df_variables, "Probabilité supplémentaire de troubles du comportement")
-            / 100
-        )
 
-    if anxiete:
-        # ANXIETE MERE
-        camsp_sante_social = val(
-            df_variables, "Coût attribuable à l'anxiété périnat par femme chaque année"
-        ) * val(df_variables, "Durée moyenne de l'anxiété")
+def process_values_batch(params, positions=None):
+    """params : matrice (N, n_vars), une ligne par jeu de paramètres, colonnes dans
+    l'ordre des lignes de bdd_variables.csv
 
-        camsoc_qaly = (
-            val(df_variables, "Perte de qualité de vie pour la mère en cas d'anxiété")
-            * val(df_variables, "Durée moyenne de l'anxiété")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
+    Renvoie les coûts par cas (N, 3 maladies, Mère/Bébé/Total) et la répartition
+    par secteur (N, 3 secteurs), sans boucle sur les N scénarios"""
 
-        camsoc_perte_prod = (
-            val(df_variables, "Nombre de semaines de travail perdues chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-            * val(df_variables, "Durée moyenne de l'anxiété")
-        )
+    if positions is None:
+        positions = default_positions()
 
-        # ANXIETE BEBE
-        cabsp_sante_social = (
-            val(df_variables, "Coût pour le service public d'une naissance prématurée")
-            * val(
-                df_variables, "Risque suppl. de naissance prématurée en cas d'anxiété"
-            )
-            / 100
-            + val(df_variables, "Coût des problèmes émotionnels en cas d'anxiété")
-            + val(df_variables, "Coût pour la Sécu des troubles du comportement par cas")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(
-                df_variables,
-                "Coût pour le service public de douleur abdominale chronique pédiatrique par an",
-            )
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
+    params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+    return evaluate_params(params, positions)
 
-        cabsp_educ = val(df_variables, "Coût lié aux problèmes émotionnels si anxiété")
 
-        cabsp_justice = (
-            val(df_variables, "Coût pour la justice des troubles du comportement par cas")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
+def process_values_sensi_batch(params, positions=None):
+    """Coût total par naissance (N,), comme process_values_sensi pour chaque ligne"""
 
-        cabsoc_qaly = (
-            val(df_variables, "Coût de perte de qualité de vie si anxiété (en QALY)")
-            + val(df_variables, "Coûts des problème emotionnels (en QALY)")
-            + val(df_variables, "Coûts des troubles du comportement par cas (en QALY)")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
+    if positions is None:
+        positions = default_positions()
 
-        cabsoc_perte_prod = (
-            val(
-                df_variables,
-                "Coût de pertes de productivité liées aux problèmes émotionnels",
-            )
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(df_variables, "Coût lié aux douleurs abdominales chroniques")
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
+    params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+    couts, _ = evaluate_params(params, positions)
+    return (couts[..., 2] * prevalences_params(params, positions)).sum(axis=-1)
 
-        cabsoc_autres = val(
-            df_variables, "Coût suppl total pour victimes crimes et délits par cas"
-        ) * val(
-            df_variables, "Risque supplémentaire de troubles du comportement"
-        ) / 100 + (
-            val(df_variables, "Coût unpaid care douleurs abdo chroniques")
-            + val(df_variables, "Coût out-of-pocket lié douleurs abdo chroniques")
-        ) * val(
-            df_variables,
-            "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-        ) / 100 * val(
-            df_variables, "Durée moyenne des douleurs abdominales chroniques en année"
-        )
 
-    if psychose:
-        # PSYCHOSE MERE
-        cpmsp_sante_social = val(df_variables, "Coût pour la Sécu d'une psychose")
-
-        cpmsoc_qaly = val(
-            df_variables, "Risque supplémentaire de suicide en cas de psychose"
-        ) / 100 * val(df_variables, "Prix d'une vie") * int(1e6) + val(
-            df_variables, "Perte de qualité de vie pour une psychose"
-        ) * val(
-            df_variables, "Durée moyenne d'une psychose"
-        ) * val(
-            df_variables, "Valeur d'une année de QALY"
-        )
+def params_territoriaux(params, salaires_horaires, positions=None):
+    """Un jeu de paramètres par territoire (n_territoires, n_vars) : le revenu horaire
+    moyen national d'une femme est remplacé par le salaire horaire des femmes de
+    chaque territoire, qui entre dans cdmsoc_perte_prod et camsoc_perte_prod"""
 
-        cpmsoc_perte_prod = (
-            val(df_variables, "Perte de productivité en cas d'épisode de schizophrènie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
+    if positions is None:
+        positions = default_positions()
+
+    salaires_horaires = np.asarray(salaires_horaires, dtype=np.float64)
+    params = np.repeat(
+        np.atleast_2d(np.asarray(params, dtype=np.float64)), len(salaires_horaires), axis=0
+    )
+    params[:, positions[INDICES_VARIABLES["revenu_horaire_femme"]]] = salaires_horaires
+    return params
 
-        cpmsoc_autres = (
-            val(df_variables, "Coût unpaid care en cas de schizophrénie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
+
+class ResultatModele:
+    """Sorties d'une évaluation du modèle, en tableaux numpy : coûts par cas et par
+    naissance (3 maladies, Mère/Bébé/Total) et répartition par secteur (3 secteurs)"""
+
+    __slots__ = ("par_cas", "par_naissance", "repartition")
+
+    def __init__(self, par_cas, par_naissance, repartition):
+        self.par_cas = par_cas
+        self.par_naissance = par_naissance
+        self.repartition = repartition
+
+    @property
+    def total_par_naissance(self):
+        return float(self.par_naissance[:, 2].sum())
+
+
+def evaluer(params, positions=None, maladies=None):
+    """Évalue un jeu de paramètres (n_vars,) sans construire de DataFrame.
+    Pour plusieurs jeux (N, n_vars), voir evaluer_lot"""
+
+    if positions is None:
+        positions = default_positions()
+
+    params = np.asarray(params, dtype=np.float64)
+    if params.ndim != 1:
+        raise ValueError(
+            f"evaluer attend un vecteur (n_vars,), pas {params.shape} : "
+            "utiliser evaluer_lot"
         )
+    par_cas, repartition = evaluate_params(params, positions, maladies)
+    par_naissance = par_cas * prevalences_params(params, positions)[:, None]
+    return ResultatModele(par_cas, par_naissance, repartition)
+
+
+def evaluer_lot(params, positions=None):
+    """Un ResultatModele par ligne de params (N, n_vars), évalués en un seul lot"""
 
-        # PSYCHOSE BEBE
-        cpbsp_sante_social = (
-            val(df_variables, "Risque supplémentaire de naissance prématurée")
-            / 100
-            * val(
-                df_variables, "Coût pour le service public d'une naissance prématurée"
+    if positions is None:
+        positions = default_positions()
+
+    params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+    par_cas, repartition = evaluate_params(params, positions)
+    par_naissance = par_cas * prevalences_params(params, positions)[..., None]
+    return [ResultatModele(*r) for r in zip(par_cas, par_naissance, repartition)]
+
+
+class ModeleIncremental:
+    """Jeu de paramètres évalué une fois, qui garde la valeur de chaque nœud du
+    graphe : après un changement de variables, seuls les nœuds en aval sont
+    recalculés"""
+
+    def __init__(self, params, positions=None):
+        if positions is None:
+            positions = default_positions()
+
+        self.positions = positions
+        self.params = np.array(params, dtype=np.float64)
+        self._valeurs = _termes(dict(zip(VARIABLES, self.params[positions].tolist())))
+
+    def mettre_a_jour(self, params):
+        """Remplace le jeu de paramètres. Renvoie les nœuds recalculés"""
+
+        params = np.array(params, dtype=np.float64)
+        modifiees = {
+            alias: nouvelle
+            for alias, ancienne, nouvelle in zip(
+                VARIABLES,
+                self.params[self.positions].tolist(),
+                params[self.positions].tolist(),
             )
-        )
+            if ancienne != nouvelle
+        }
+
+        self.params = params
+        self._valeurs.update(modifiees)
+        recalcules = noeuds_en_aval(tuple(modifiees))
+        _evaluer_noeuds(self._valeurs, recalcules)
+        return recalcules
 
-        cpbsoc_qaly = (
-            val(df_variables, "Risque supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
+    def resultat(self, maladies=None):
+        par_cas, repartition = _agreger(self._valeurs, maladies)
+        par_naissance = par_cas * prevalences_params(self.params, self.positions)[:, None]
+        return ResultatModele(par_cas, par_naissance, repartition)
+
+    def balayer(self, alias, valeurs, maladies=None):
+        """Évalue le modèle pour chaque valeur de la variable alias, les autres restant
+        fixes : seuls les nœuds en aval sont évalués, sur le vecteur des valeurs.
+        Renvoie un ResultatModele de tableaux (n, ...)"""
+
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        noeuds = dict(self._valeurs)
+        noeuds[alias] = valeurs
+        _evaluer_noeuds(noeuds, noeuds_en_aval((alias,)))
+
+        par_cas, repartition = _agreger(noeuds, maladies)
+        # une prévalence balayée varie d'une ligne à l'autre
+        prevalences = np.stack(
+            np.broadcast_arrays(*[noeuds[p] / 100 for p in PREVALENCES]), axis=-1
         )
+        par_naissance = par_cas * prevalences[..., None]
+        return ResultatModele(par_cas, par_naissance, repartition)
 
-    # COUT DEPRESSION
-    cout_depression_mere_SP = cdmsp_sante_social
-    cout_depression_mere_SOC = cdmsoc_qaly + cdmsoc_perte_prod
-
-    cout_depression_bebe_SP = cdbsp_sante_social + cdbsp_educ + cdbsp_justice
-    cout_depression_bebe_SOC = cdbsoc_qaly + cdbsoc_perte_prod + cdbsoc_autres
-
-    # COUT ANXIETE
-    cout_anxiete_mere_SP = camsp_sante_social
-    cout_anxiete_mere_SOC = camsoc_qaly + camsoc_perte_prod
-
-    cout_anxiete_bebe_SP = cabsp_sante_social + cabsp_educ + cabsp_justice
-    cout_anxiete_bebe_SOC = cabsoc_qaly + cabsoc_perte_prod + cabsoc_autres
-
-    # COUT PSYCHOSE
-    cout_psychose_mere_SP = cpmsp_sante_social
-    cout_psychose_mere_SOC = cpmsoc_qaly + cpmsoc_perte_prod + cpmsoc_autres
-
-    cout_psychose_bebe_SP = cpbsp_sante_social
-    cout_psychose_bebe_SOC = cpbsoc_qaly
-
-    # COUT PAR MALADIE
-    cout_depression_mere = int(cout_depression_mere_SP + cout_depression_mere_SOC)
-    cout_depression_bebe = int(cout_depression_bebe_SP + cout_depression_bebe_SOC)
-
-    cout_anxiete_mere = int(cout_anxiete_mere_SP + cout_anxiete_mere_SOC)
-    cout_anxiete_bebe = int(cout_anxiete_bebe_SP + cout_anxiete_bebe_SOC)
-
-    cout_psychose_mere = int(cout_psychose_mere_SP + cout_psychose_mere_SOC)
-    cout_psychose_bebe = int(cout_psychose_bebe_SP + cout_psychose_bebe_SOC)
-
-    # TOTAL PAR MALADIE
-    cout_depression = cout_depression_mere + cout_depression_bebe
-    cout_anxiete = cout_anxiete_mere + cout_anxiete_bebe
-    cout_psychose = cout_psychose_mere + cout_psychose_bebe
-
-    couts = [
-        [
-            cout_depression_mere,
-            cout_depression_bebe,
-            cout_depression_mere + cout_depression_bebe,
-        ],
-        [cout_anxiete_mere, cout_anxiete_bebe, cout_anxiete_mere + cout_anxiete_bebe],
-        [
-            cout_psychose_mere,
-            cout_psychose_bebe,
-            cout_psychose_mere + cout_psychose_bebe,
-        ],
-    ]
+
+def tableaux(resultat):
+    """Mise en forme d'un ResultatModele en DataFrames : coûts par cas, coûts par
+    naissance avec la ligne des trois maladies, et répartition par secteur"""
+    import pandas as pd
 
     df_par_cas = pd.DataFrame(
-        couts,
-        columns=["Mère", "Bébé", "Total"],
-        index=["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"],
+        resultat.par_cas.astype(np.int64), index=MALADIES, columns=PERSONNES
     )
-    
-    prevalences = (
-        df_variables
-        .loc[
-            [
-                "Prévalence de " + mal
-                for mal in ["la dépression", "l'anxiété", "la psychose"]
-            ]
-        ]
-        .iloc[:, -1]
-        .values
-        / 100
+    df_par_naissance = pd.DataFrame(
+        np.vstack([resultat.par_naissance, resultat.par_naissance.sum(axis=0)]),
+        index=MALADIES + ["Total des trois maladies"],
+        columns=PERSONNES,
+    )
+    df_repartition = pd.DataFrame(
+        resultat.repartition,
+        index=SECTEURS,
+        columns=["Répartition des coûts par secteur"],
+    )
+    return df_par_cas, df_par_naissance, df_repartition
+
+
+def _maladies(depression, anxiete, psychose):
+    return [
+        code
+        for code, active in zip(CODES_MALADIES, [depression, anxiete, psychose])
+        if active
+    ]
+
+
+@profile
+def process_values(df_variables, depression=True, anxiete=True, psychose=True):
+    """Coûts par cas (maladie x Mère/Bébé/Total) et répartition par secteur pour les
+    valeurs de la dernière colonne de df_variables"""
+
+    params, positions = params_from_df(df_variables), compile_model(df_variables)
+    revenu_horaire = params[positions[INDICES_VARIABLES["revenu_horaire_femme"]]]
+    logger.debug(
+        "Revenu hebdomadaire moyen d'une femme : %s", revenu_hebdo_femme(revenu_horaire)
     )
 
-    df_par_naissance = df_par_cas.copy()
-    #print(df_par_naissance.iloc[:, 1:])
-    df_par_naissance.iloc[:, :] = df_par_naissance.iloc[:, :].mul(prevalences, axis=0)
-    
+    resultat = evaluer(params, positions, _maladies(depression, anxiete, psychose))
+    df_par_cas, _, df_repartition_secteur = tableaux(resultat)
+    return df_par_cas, df_repartition_secteur
+
 
-    return df_par_naissance['Total'].sum()
+def process_values_sensi(df_variables, depression=True, anxiete=True, psychose=True):
+    """Coût total par naissance (pondéré par les prévalences) des maladies retenues"""
 
+    return evaluer(
+        params_from_df(df_variables),
+        compile_model(df_variables),
+        _maladies(depression, anxiete, psychose),
+    ).total_par_naissance
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from cache import cle_sliders
+from model import compile_model, evaluer, signature_modele
+
+
+# preset -> colonne de bdd_variables.csv ; central est le jeu de valeurs par défaut.
+# Pas de preset bas : la colonne mini vaut 0 pour toutes les variables, soit un coût
+# nul et des parts indéfinies
+PRESETS = {"central": "val", "haut": "maxi"}
+
+
+def vecteurs_presets(df_variables):
+    """Valeurs des variables de chaque preset, dans l'ordre des lignes"""
+    return {
+        nom: df_variables[colonne].to_numpy(dtype=np.float64)
+        for nom, colonne in PRESETS.items()
+    }
+
+
+def _signature(vecteurs, positions):
+    """Empreinte du modèle (signature_modele) et des valeurs des presets : un fichier
+    enregistré avec une autre version du modèle ou d'autres valeurs est recalculé"""
+    empreinte = hashlib.sha1(signature_modele(positions).encode())
+    for nom, vecteur in sorted(vecteurs.items()):
+        empreinte.update(f"{nom}:{cle_sliders(vecteur)}".encode())
+    return empreinte.hexdigest()
+
+
+def _lire(path, signature):
+    """Résultats enregistrés dans path, None si le fichier manque, est illisible
+    (tronqué, autre version du code) ou a une autre signature"""
+    try:
+        with open(path, "rb") as f:
+            enregistre = pickle.load(f)
+        if enregistre["signature"] == signature:
+            return enregistre["resultats"]
+    except (
+        FileNotFoundError,
+        EOFError,
+        pickle.UnpicklingError,
+        KeyError,
+        AttributeError,
+        TypeError,
+    ):
+        pass
+    return None
+
+
+def _ecrire(path, contenu):
+    """Écrit dans un fichier temporaire du même dossier puis le renomme : les workers
+    qui démarrent en même temps ne lisent jamais un fichier à moitié écrit"""
+    descripteur, temporaire = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descripteur, "wb") as f:
+            pickle.dump(contenu, f)
+        os.replace(temporaire, path)
+    except BaseException:
+        os.remove(temporaire)
+        raise
+
+
+class TablePresets:
+    """Résultats du modèle (ResultatModele) des presets, calculés une fois au
+    démarrage et jamais évincés, indexés comme les caches par cle_sliders.
+    path : fichier où les enregistrer et d'où les relire au démarrage suivant"""
+
+    def __init__(self, df_variables, positions=None, path=None):
+        if positions is None:
+            positions = compile_model(df_variables)
+
+        self.vecteurs = vecteurs_presets(df_variables)
+        self.noms = {cle_sliders(v): nom for nom, v in self.vecteurs.items()}
+        signature = _signature(self.vecteurs, positions)
+
+        self._resultats = None
+        if path is not None:
+            self._resultats = _lire(path, signature)
+
+        if self._resultats is None:
+            self._resultats = {
+                cle_sliders(v): evaluer(v, positions) for v in self.vecteurs.values()
+            }
+            if path is not None:
+                _ecrire(path, {"signature": signature, "resultats": self._resultats})
+
+    def get(self, cle, defaut=None):
+        return self._resultats.get(cle, defaut)
+
+    def __contains__(self, cle):
+        return cle in self._resultats
+
+    def __len__(self):
+        return len(self._resultats)
@@ -0,0 +1,84 @@
+import cProfile
+import functools
+import itertools
+import os
+import threading
+import time
+
+
+# PSYTHON_PROFIL=1 : chaque appel d'une fonction décorée par @profile est profilé
+# PSYTHON_PROFIL=requete : seulement pendant les requêtes d'un navigateur passé par
+# une page avec ?profil=1 (voir activer_par_requete)
+# non défini : @profile renvoie la fonction telle quelle, sans aucun surcoût
+MODE = os.environ.get("PSYTHON_PROFIL", "")
+DOSSIER = os.environ.get("PSYTHON_PROFIL_DOSSIER", "profils")
+COOKIE = "psython_profil"
+
+_local = threading.local()
+_compteur = itertools.count()
+
+
+def _demande():
+    if MODE != "requete":
+        return True
+
+    import flask
+
+    return flask.has_request_context() and flask.g.get("profil", False)
+
+
+def profile(fonction):
+    """Écrit un fichier .prof (cProfile, à ouvrir avec pstats ou snakeviz) par appel
+    dans DOSSIER quand le profilage est activé. Un appel imbriqué dans un appel déjà
+    profilé est compté dans le profil de l'appel englobant"""
+
+    if not MODE:
+        return fonction
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        if getattr(_local, "en_cours", False) or not _demande():
+            return fonction(*args, **kwargs)
+
+        profil = cProfile.Profile()
+        _local.en_cours = True
+        try:
+            return profil.runcall(fonction, *args, **kwargs)
+        finally:
+            _local.en_cours = False
+            os.makedirs(DOSSIER, exist_ok=True)
+            nom = "{}-{}-{}-{}.prof".format(
+                fonction.__qualname__,
+                time.strftime("%Y%m%d-%H%M%S"),
+                os.getpid(),
+                next(_compteur),
+            )
+            profil.dump_stats(os.path.join(DOSSIER, nom))
+
+    return enveloppe
+
+
+def activer_par_requete(server, parametre="profil"):
+    """En mode requete : ?profil=1 sur une page pose un cookie, et les callbacks
+    envoyés ensuite par ce navigateur sont profilés. ?profil=0 enlève le cookie"""
+
+    if MODE != "requete":
+        return
+
+    import flask
+
+    @server.before_request
+    def _profil_demande():
+        demande = flask.request.args.get(parametre)
+        if demande is None:
+            demande = flask.request.cookies.get(COOKIE)
+        flask.g.profil = demande == "1"
+
+    @server.after_request
+    def _profil_cookie(response):
+        demande = flask.request.args.get(parametre)
+        if demande == "1":
+            response.set_cookie(COOKIE, "1")
+        elif demande == "0":
+            response.delete_cookie(COOKIE)
+        return response
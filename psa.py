@@ -0,0 +1,254 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from model import MALADIES, SECTEURS_TEXTE, compile_model, evaluate_params
+from model import prevalences_params
+from statistiques import MomentsCourants, SketchQuantiles
+
+
+DISTRIBUTIONS = ["triangulaire", "beta", "gamma", "fixe"]
+QUANTILES = [0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975]
+
+
+def distributions_par_defaut(df_variables):
+    """Loi de chaque variable selon son unité : beta (PERT) pour les %,
+    gamma pour les coûts en €, triangulaire sur mini/val/maxi sinon"""
+
+    lois = np.where(
+        df_variables["unit"] == "%",
+        "beta",
+        np.where(df_variables["unit"] == "€", "gamma", "triangulaire"),
+    )
+    return dict(zip(df_variables["nom_variable"], lois))
+
+
+def _parametres_lois(df_variables, distributions):
+    """Regroupe les colonnes par loi et précalcule les paramètres de chaque loi"""
+
+    lois = distributions_par_defaut(df_variables)
+    if distributions is not None:
+        inconnues = set(distributions.values()) - set(DISTRIBUTIONS)
+        if inconnues:
+            raise ValueError(f"Lois inconnues : {inconnues}")
+        lois.update(distributions)
+
+    mini = df_variables["mini"].to_numpy(dtype=np.float64)
+    maxi = df_variables["maxi"].to_numpy(dtype=np.float64)
+    mode = df_variables["val"].to_numpy(dtype=np.float64)
+    lois = np.array([lois[nom] for nom in df_variables["nom_variable"]])
+
+    # une variable sans étendue ou de moyenne nulle n'a rien à tirer
+    lois[(maxi <= mini) | ((lois == "gamma") & (mode <= 0))] = "fixe"
+
+    groupes = dict()
+    for loi in DISTRIBUTIONS:
+        cols = np.flatnonzero(lois == loi)
+        if len(cols) == 0:
+            continue
+        a, m, b = mini[cols], mode[cols], maxi[cols]
+        if loi == "triangulaire":
+            groupes[loi] = (cols, (a, m, b))
+        elif loi == "beta":
+            # loi PERT : beta sur [mini, maxi] de mode val
+            alpha = 1 + 4 * (m - a) / (b - a)
+            beta = 1 + 4 * (b - m) / (b - a)
+            groupes[loi] = (cols, (a, b - a, alpha, beta))
+        elif loi == "gamma":
+            # moyenne val, écart-type tel que [mini, maxi] couvre environ 4 écarts-types
+            ecart_type = (b - a) / 4
+            groupes[loi] = (cols, (m ** 2 / ecart_type ** 2, ecart_type ** 2 / m))
+        else:
+            groupes[loi] = (cols, (m,))
+
+    return groupes
+
+
+def sample_params(df_variables, n, rng=None, distributions=None, groupes=None):
+    """Tire n jeux de paramètres (n, n_vars) selon les lois de chaque variable
+    distributions : dict nom_variable -> loi, pour remplacer les lois par défaut"""
+
+    rng = np.random.default_rng(rng)
+    if groupes is None:
+        groupes = _parametres_lois(df_variables, distributions)
+
+    params = np.empty((n, df_variables.shape[0]), dtype=np.float64)
+    for loi, (cols, p) in groupes.items():
+        taille = (n, len(cols))
+        if loi == "triangulaire":
+            params[:, cols] = rng.triangular(*p, size=taille)
+        elif loi == "beta":
+            debut, etendue, alpha, beta = p
+            params[:, cols] = debut + etendue * rng.beta(alpha, beta, size=taille)
+        elif loi == "gamma":
+            params[:, cols] = rng.gamma(*p, size=taille)
+        else:
+            params[:, cols] = p[0]
+
+    return params
+
+
+def tirages(df_variables, n_draws, chunk_size=50_000, seed=None, distributions=None):
+    """Générateur de paquets de jeux de paramètres (au plus chunk_size lignes)"""
+
+    rng = np.random.default_rng(seed)
+    groupes = _parametres_lois(df_variables, distributions)
+    for debut in range(0, n_draws, chunk_size):
+        yield sample_params(
+            df_variables, min(chunk_size, n_draws - debut), rng, groupes=groupes
+        )
+
+
+def evaluations(paquets, positions):
+    """Générateur des coûts par naissance de chaque paquet de paramètres : par maladie
+    (m, 3) et par secteur (m, 3)"""
+
+    for params in paquets:
+        couts, repartition = evaluate_params(params, positions)
+        par_naissance = couts[..., 2] * prevalences_params(params, positions)
+        yield par_naissance, repartition * par_naissance.sum(axis=1, keepdims=True)
+
+
+def simulate(
+    df_variables, n_draws=100_000, chunk_size=50_000, seed=None, distributions=None
+):
+    """Passe n_draws tirages dans le modèle vectorisé, par paquets de chunk_size
+    lignes pour borner la mémoire. Renvoie le coût par naissance (n_draws, 3 maladies)"""
+
+    paquets = tirages(df_variables, n_draws, chunk_size, seed, distributions)
+    return np.concatenate(
+        [
+            par_naissance
+            for par_naissance, _ in evaluations(paquets, compile_model(df_variables))
+        ]
+    )
+
+
+def resume_psa(couts_par_naissance, quantiles=QUANTILES):
+    """Moyenne, écart-type et quantiles du coût par naissance, par maladie et au total"""
+
+    valeurs = np.column_stack(
+        [couts_par_naissance, couts_par_naissance.sum(axis=1)]
+    )
+    resume = pd.DataFrame(
+        np.quantile(valeurs, quantiles, axis=0).T,
+        index=MALADIES + ["Total des trois maladies"],
+        columns=[f"q{100 * q:g}" for q in quantiles],
+    )
+    resume.insert(0, "Écart-type", valeurs.std(axis=0, ddof=1))
+    resume.insert(0, "Moyenne", valeurs.mean(axis=0))
+    return resume
+
+
+def courbe_acceptabilite(total_par_naissance, seuils=None):
+    """Courbe de type CEAC : pour chaque seuil de dépense de prévention par naissance,
+    probabilité que le coût évitable par naissance soit au moins égal à ce seuil"""
+
+    if seuils is None:
+        seuils = np.linspace(0, np.quantile(total_par_naissance, 0.99), 51)
+
+    tries = np.sort(total_par_naissance)
+    au_dessous = np.searchsorted(tries, seuils, side="left")
+    return pd.DataFrame(
+        {
+            "Seuil (€ par naissance)": seuils,
+            "Probabilité": 1 - au_dessous / len(tries),
+        }
+    )
+
+
+def run_psa_streaming(
+    df_variables,
+    n_draws=1_000_000,
+    chunk_size=50_000,
+    seed=None,
+    distributions=None,
+    quantiles=QUANTILES,
+    seuils=None,
+    precision=0.005,
+):
+    """Comme run_psa, mais chaque paquet de tirages est réduit dès son évaluation à des
+    statistiques courantes (moyenne, variance, sketch de quantiles à precision relative
+    près) puis oublié : la mémoire ne dépend pas de n_draws.
+    Renvoie le résumé par maladie, au total et par secteur, et la courbe d'acceptabilité"""
+
+    lignes = MALADIES + ["Total des trois maladies"] + SECTEURS_TEXTE
+    moments = MomentsCourants(len(lignes))
+    sketches = [SketchQuantiles(precision) for _ in lignes]
+
+    paquets = tirages(df_variables, n_draws, chunk_size, seed, distributions)
+    for par_naissance, par_secteur in evaluations(paquets, compile_model(df_variables)):
+        valeurs = np.column_stack(
+            [par_naissance, par_naissance.sum(axis=1), par_secteur]
+        )
+        moments.ajouter(valeurs)
+        for sketch, colonne in zip(sketches, valeurs.T):
+            sketch.ajouter(colonne)
+
+    resume = pd.DataFrame(
+        [sketch.quantiles(quantiles) for sketch in sketches],
+        index=lignes,
+        columns=[f"q{100 * q:g}" for q in quantiles],
+    )
+    resume.insert(0, "Écart-type", moments.ecart_type)
+    resume.insert(0, "Moyenne", moments.moyenne)
+
+    total = sketches[len(MALADIES)]
+    if seuils is None:
+        seuils = np.linspace(0, total.quantiles(0.99)[0], 51)
+    acceptabilite = pd.DataFrame(
+        {
+            "Seuil (€ par naissance)": seuils,
+            "Probabilité": total.fraction_au_dessus(seuils),
+        }
+    )
+
+    return resume, acceptabilite
+
+
+def run_psa(
+    df_variables,
+    n_draws=100_000,
+    chunk_size=50_000,
+    seed=None,
+    distributions=None,
+    quantiles=QUANTILES,
+    seuils=None,
+):
+    """Analyse de sensibilité probabiliste complète : renvoie le tableau de quantiles
+    du coût par naissance et la courbe d'acceptabilité"""
+
+    couts_par_naissance = simulate(
+        df_variables, n_draws, chunk_size, seed=seed, distributions=distributions
+    )
+    return (
+        resume_psa(couts_par_naissance, quantiles),
+        courbe_acceptabilite(couts_par_naissance.sum(axis=1), seuils),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Analyse de sensibilité probabiliste du coût par naissance"
+    )
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    parser.add_argument("--n-draws", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="statistiques courantes en mémoire constante, sans garder les tirages",
+    )
+    args = parser.parse_args()
+
+    resume, acceptabilite = (run_psa_streaming if args.streaming else run_psa)(
+        pd.read_csv(args.variables),
+        n_draws=args.n_draws,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+    )
+    print(resume.round(0).to_string())
+    print()
+    print(acceptabilite.to_string(index=False))
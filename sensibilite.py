@@ -0,0 +1,166 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import SQLiteCache, evaluer_avec_cache
+from model import VARIABLES, ModeleIncremental, compile_model, evaluer_lot
+from model import params_from_df, process_values_sensi_batch, signature_modele
+from profilage import profile
+
+
+# Table des variables partagée en lecture seule par chaque processus
+_partage = dict()
+
+
+def _init_worker(
+    params_base, positions, debut_grille, fin_grille, n_points, cache_path=None
+):
+    _partage.update(
+        modele=ModeleIncremental(params_base, positions),
+        alias={position: alias for alias, position in zip(VARIABLES, positions)},
+        debut_grille=debut_grille,
+        fin_grille=fin_grille,
+        n_points=n_points,
+        cache=(
+            SQLiteCache(cache_path, version=signature_modele(positions))
+            if cache_path
+            else None
+        ),
+    )
+
+
+def _balayer(indices_variables):
+    """Fait varier chaque variable de la liste sur sa grille, les autres restant à
+    leur valeur courante : seuls les termes qui dépendent de la variable sont
+    recalculés. Renvoie le min et le max du coût total par naissance"""
+
+    modele = _partage["modele"]
+    n_points = _partage["n_points"]
+
+    extremes = dict()
+    for idx in indices_variables:
+        grille = np.linspace(
+            _partage["debut_grille"][idx], _partage["fin_grille"][idx], n_points
+        )
+        if _partage["cache"] is not None:
+            # scénarios relus dans le cache partagé ou évalués en un lot
+            params = np.tile(modele.params, (n_points, 1))
+            params[:, idx] = grille
+            resultats = evaluer_avec_cache(
+                params,
+                _partage["cache"],
+                lambda p: evaluer_lot(p, modele.positions),
+            )
+            totaux = np.array([r.total_par_naissance for r in resultats])
+        elif idx in _partage["alias"]:
+            resultat = modele.balayer(_partage["alias"][idx], grille)
+            totaux = resultat.par_naissance[..., 2].sum(axis=-1)
+        else:
+            # variable absente des formules
+            totaux = np.full(n_points, modele.resultat().total_par_naissance)
+        extremes[idx] = (totaux.min(), totaux.max())
+
+    return extremes
+
+
+@profile
+def run_bauer_hamby(df_variables, n_points=3, n_jobs=None, cache_path=None):
+    """Analyse de sensibilité un-à-un : chaque variable parcourt n_points valeurs entre
+    mini et 2 * val, comme dans analyse_sensibilite.ipynb.
+    Le travail est réparti par variable sur n_jobs processus (tous les coeurs par défaut,
+    1 pour tout calculer dans le processus courant).
+    cache_path : base SQLite du cache de résultats partagé (cache.SQLiteCache)
+
+    Renvoie le tableau des indices de Bauer-Hamby triés et leur moyenne par catégorie"""
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    initargs = (
+        params_from_df(df_variables),
+        compile_model(df_variables),
+        df_variables["mini"].to_numpy(dtype=np.float64),
+        df_variables["val"].to_numpy(dtype=np.float64) * 2,
+        n_points,
+        cache_path,
+    )
+    n_variables = df_variables.shape[0]
+
+    extremes = dict()
+    if n_jobs == 1:
+        _init_worker(*initargs)
+        extremes.update(_balayer(range(n_variables)))
+    else:
+        # importé ici : l'application n'utilise que tornado, sans pool de processus
+        from concurrent.futures import ProcessPoolExecutor
+
+        paquets = np.array_split(np.arange(n_variables), min(n_variables, 4 * n_jobs))
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_worker, initargs=initargs
+        ) as executor:
+            for resultat in executor.map(_balayer, paquets):
+                extremes.update(resultat)
+
+    indices = {
+        df_variables["nom_variable"].iloc[idx]: round(1 - (my_min / my_max), 3)
+        for idx, (my_min, my_max) in extremes.items()
+    }
+
+    bauer_hamby = pd.DataFrame(indices, index=["Indice de Bauer-Hamby"]).T
+    bauer_hamby["Catégorie"] = (
+        df_variables.set_index("nom_variable").loc[bauer_hamby.index, "category"].values
+    )
+    bauer_hamby = bauer_hamby.sort_values(by="Indice de Bauer-Hamby", ascending=True)
+
+    par_categorie = (
+        bauer_hamby.groupby("Catégorie")["Indice de Bauer-Hamby"]
+        .mean()
+        .to_frame()
+        .sort_values(by="Indice de Bauer-Hamby")
+    )
+
+    return bauer_hamby, par_categorie
+
+
+def tornado(params, mini, maxi, positions=None):
+    """Coût total par naissance quand chaque variable passe à son mini puis à son maxi,
+    les autres restant aux valeurs de params : les 2 * n_vars scénarios sont évalués en
+    un seul lot. Renvoie le coût de référence et les coûts (n_vars, mini/maxi)"""
+
+    params = np.asarray(params, dtype=np.float64)
+    n_vars = len(params)
+    variables = np.arange(n_vars)
+
+    scenarios = np.tile(params, (2 * n_vars + 1, 1))
+    scenarios[1 + variables, variables] = mini
+    scenarios[1 + n_vars + variables, variables] = maxi
+
+    totaux = process_values_sensi_batch(scenarios, positions)
+    return totaux[0], totaux[1:].reshape(2, n_vars).T
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Indices de Bauer-Hamby (analyse de sensibilité un-à-un)"
+    )
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    parser.add_argument("--n-points", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--output", default=None, help="fichier CSV des indices")
+    parser.add_argument("--cache", help="base SQLite du cache de résultats partagé")
+    args = parser.parse_args()
+
+    bauer_hamby, par_categorie = run_bauer_hamby(
+        pd.read_csv(args.variables),
+        n_points=args.n_points,
+        n_jobs=args.n_jobs,
+        cache_path=args.cache,
+    )
+    if args.output:
+        bauer_hamby.to_csv(args.output)
+
+    print(bauer_hamby.to_string())
+    print()
+    print(par_categorie.to_string())
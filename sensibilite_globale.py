@@ -0,0 +1,147 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from model import compile_model, process_values_sensi_batch
+from psa import sample_params
+
+
+def _bornes(df_variables):
+    return (
+        df_variables["mini"].to_numpy(dtype=np.float64),
+        df_variables["maxi"].to_numpy(dtype=np.float64),
+    )
+
+
+def _tableau(df_variables, indices):
+    """Met les indices en forme, une ligne par variable avec sa catégorie"""
+    tableau = pd.DataFrame(indices, index=df_variables["nom_variable"].values)
+    tableau["Catégorie"] = df_variables["category"].values
+    return tableau
+
+
+def saltelli_matrices(df_variables, n, seed=None, uniforme=True):
+    """Tire une fois les deux matrices indépendantes A et B (n, n_vars) du schéma de
+    Saltelli : uniformes sur [mini, maxi], ou selon les lois de psa.py"""
+
+    rng = np.random.default_rng(seed)
+    if uniforme:
+        mini, maxi = _bornes(df_variables)
+        return (
+            rng.uniform(mini, maxi, size=(n, len(mini))),
+            rng.uniform(mini, maxi, size=(n, len(mini))),
+        )
+    return sample_params(df_variables, n, rng), sample_params(df_variables, n, rng)
+
+
+def sobol_indices(df_variables, n=10_000, seed=None, matrices=None):
+    """Indices de Sobol du premier ordre (Saltelli 2010) et totaux (Jansen 1999) du
+    coût total par naissance, pour toutes les variables.
+
+    Les matrices A et B (voir saltelli_matrices) et leurs évaluations sont
+    réutilisées pour chaque variable : n * (2 * n_vars + 2) évaluations au total,
+    chacune passant par le modèle vectorisé"""
+
+    if matrices is None:
+        matrices = saltelli_matrices(df_variables, n, seed)
+    A, B = matrices
+
+    positions = compile_model(df_variables)
+    f_A = process_values_sensi_batch(A, positions)
+    f_B = process_values_sensi_batch(B, positions)
+    variance = np.var(np.concatenate([f_A, f_B]))
+
+    premier_ordre = np.empty(A.shape[1])
+    total = np.empty(A.shape[1])
+    for i in range(A.shape[1]):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        BA = B.copy()
+        BA[:, i] = A[:, i]
+        f_AB = process_values_sensi_batch(AB, positions)
+        f_BA = process_values_sensi_batch(BA, positions)
+
+        # estimateurs symétriques en A et B, moyennés
+        premier_ordre[i] = (
+            np.mean(f_B * (f_AB - f_A)) + np.mean(f_A * (f_BA - f_B))
+        ) / (2 * variance)
+        total[i] = (
+            np.mean((f_A - f_AB) ** 2) + np.mean((f_B - f_BA) ** 2)
+        ) / (4 * variance)
+
+    return _tableau(
+        df_variables, {"Indice de premier ordre": premier_ordre, "Indice total": total}
+    ).sort_values(by="Indice total", ascending=False)
+
+
+def morris_trajectoires(n_variables, r, niveaux=4, seed=None):
+    """Trajectoires de Morris (r, n_variables + 1, n_variables) dans [0, 1]^k :
+    chaque pas déplace une seule variable de +/- delta, dans un ordre aléatoire.
+    Renvoie aussi, pour chaque pas, la variable déplacée et le signe du déplacement"""
+
+    rng = np.random.default_rng(seed)
+    delta = niveaux / (2 * (niveaux - 1))
+
+    # point de départ sur la grille, choisi pour que x + delta reste dans [0, 1]
+    depart = rng.integers(0, niveaux // 2, size=(r, n_variables)) / (niveaux - 1)
+    signes = rng.choice([-1.0, 1.0], size=(r, n_variables))
+    depart = np.where(signes > 0, depart, depart + delta)
+    ordre = np.argsort(rng.random((r, n_variables)), axis=1)
+
+    increments = np.zeros((r, n_variables, n_variables))
+    lignes = np.arange(r)[:, None]
+    pas = np.arange(n_variables)[None, :]
+    increments[lignes, pas, ordre] = signes[lignes, ordre] * delta
+
+    points = np.concatenate(
+        [depart[:, None, :], depart[:, None, :] + np.cumsum(increments, axis=1)],
+        axis=1,
+    )
+    return points, ordre, signes[lignes, ordre] * delta
+
+
+def morris_indices(df_variables, r=100, niveaux=4, seed=None):
+    """Effets élémentaires de Morris sur le coût total par naissance, en € par
+    naissance pour un déplacement sur toute l'étendue [mini, maxi] de la variable.
+    r * (n_vars + 1) évaluations, en un seul appel au modèle vectorisé"""
+
+    mini, maxi = _bornes(df_variables)
+    k = len(mini)
+    points, ordre, deplacements = morris_trajectoires(k, r, niveaux, seed)
+
+    sorties = process_values_sensi_batch(
+        (mini + points * (maxi - mini)).reshape(-1, k), compile_model(df_variables)
+    ).reshape(r, k + 1)
+
+    effets = np.empty((r, k))
+    effets[np.arange(r)[:, None], ordre] = np.diff(sorties, axis=1) / deplacements
+
+    return _tableau(
+        df_variables,
+        {
+            "mu": effets.mean(axis=0),
+            "mu*": np.abs(effets).mean(axis=0),
+            "sigma": effets.std(axis=0, ddof=1),
+        },
+    ).sort_values(by="mu*", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Indices de sensibilité globale (Morris, Sobol)"
+    )
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    parser.add_argument("--methode", choices=["sobol", "morris"], default="sobol")
+    parser.add_argument("--n", type=int, default=10_000, help="taille de A et B (Sobol)")
+    parser.add_argument("--r", type=int, default=100, help="trajectoires (Morris)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    df_variables = pd.read_csv(args.variables)
+    if args.methode == "sobol":
+        resultat = sobol_indices(df_variables, n=args.n, seed=args.seed)
+    else:
+        resultat = morris_indices(df_variables, r=args.r, seed=args.seed)
+
+    print(resultat.round(4).to_string())
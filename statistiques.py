@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class MomentsCourants:
+    """Moyenne et variance de k colonnes, mises à jour paquet par paquet
+    (formule de fusion de Chan et al.), en mémoire constante"""
+
+    def __init__(self, k):
+        self.n = 0
+        self.moyenne = np.zeros(k)
+        self._m2 = np.zeros(k)
+
+    def ajouter(self, valeurs):
+        """valeurs : tableau (m, k)"""
+        m = valeurs.shape[0]
+        if m == 0:
+            return
+        moyenne_paquet = valeurs.mean(axis=0)
+        m2_paquet = ((valeurs - moyenne_paquet) ** 2).sum(axis=0)
+
+        delta = moyenne_paquet - self.moyenne
+        total = self.n + m
+        self.moyenne = self.moyenne + delta * m / total
+        self._m2 = self._m2 + m2_paquet + delta ** 2 * self.n * m / total
+        self.n = total
+
+    @property
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else np.full_like(self._m2, np.nan)
+
+    @property
+    def ecart_type(self):
+        return np.sqrt(self.variance)
+
+
+class SketchQuantiles:
+    """Sketch de quantiles à erreur relative bornée (principe de DDSketch) : chaque
+    valeur positive tombe dans le seau ceil(log(x) / log(gamma)). Le nombre de seaux ne
+    dépend que de l'étendue des valeurs, pas du nombre de valeurs ajoutées.
+    Les valeurs nulles ou négatives sont comptées à part, comme des zéros"""
+
+    def __init__(self, precision=0.005):
+        self.precision = precision
+        self._log_gamma = np.log((1 + precision) / (1 - precision))
+        self._debut = None
+        self._comptes = np.zeros(0, dtype=np.int64)
+        self.n_zeros = 0
+        self.n = 0
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype=np.float64).ravel()
+        positives = valeurs[valeurs > 0]
+        self.n_zeros += len(valeurs) - len(positives)
+        self.n += len(valeurs)
+        if len(positives) == 0:
+            return
+
+        seaux = np.ceil(np.log(positives) / self._log_gamma).astype(np.int64)
+        debut, fin = seaux.min(), seaux.max() + 1
+        if self._debut is None:
+            self._debut = debut
+            self._comptes = np.zeros(fin - debut, dtype=np.int64)
+        elif debut < self._debut or fin > self._debut + len(self._comptes):
+            # agrandit la plage de seaux
+            nouveau_debut = min(debut, self._debut)
+            nouvelle_fin = max(fin, self._debut + len(self._comptes))
+            comptes = np.zeros(nouvelle_fin - nouveau_debut, dtype=np.int64)
+            decalage = self._debut - nouveau_debut
+            comptes[decalage : decalage + len(self._comptes)] = self._comptes
+            self._debut, self._comptes = nouveau_debut, comptes
+
+        self._comptes += np.bincount(seaux - self._debut, minlength=len(self._comptes))
+
+    def _valeurs_seaux(self):
+        gamma = np.exp(self._log_gamma)
+        indices = np.arange(self._debut, self._debut + len(self._comptes))
+        return 2 * gamma ** indices / (gamma + 1)
+
+    def quantiles(self, q):
+        """Quantiles q (tableau de probabilités), à la précision relative près"""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        rangs = q * (self.n - 1)
+        resultat = np.zeros(len(q))
+        if self._debut is None:
+            return resultat
+
+        cumul = self.n_zeros + np.cumsum(self._comptes)
+        seaux = np.searchsorted(cumul, rangs, side="right")
+        positifs = rangs >= self.n_zeros
+        resultat[positifs] = self._valeurs_seaux()[
+            np.minimum(seaux[positifs], len(self._comptes) - 1)
+        ]
+        return resultat
+
+    def fraction_au_dessus(self, seuils):
+        """Part des valeurs supérieures ou égales à chaque seuil"""
+        seuils = np.atleast_1d(np.asarray(seuils, dtype=np.float64))
+        if self._debut is None:
+            return np.where(seuils <= 0, 1.0, 0.0)
+
+        cumul = np.concatenate([[0], np.cumsum(self._comptes)])
+        au_dessous = np.where(
+            seuils > 0,
+            self.n_zeros + cumul[np.searchsorted(self._valeurs_seaux(), seuils)],
+            0,
+        )
+        return 1 - au_dessous / self.n
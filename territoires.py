@@ -0,0 +1,180 @@
+import argparse
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from model import MALADIES, SECTEURS_TEXTE, compile_model, default_positions, params_from_df
+from model import INDICES_VARIABLES, params_territoriaux, process_values_batch
+from model import prevalences_params
+
+
+ECHELONS = ["Pays", "Région", "Département", "Ville", "Circonscription"]
+ID_FRANCE = "pays-france"
+LIMITE_OPTIONS = 30
+
+
+def normaliser(texte):
+    """Forme de recherche d'un texte : sans accents, en minuscules, la ponctuation
+    (tirets, apostrophes...) remplacée par des espaces"""
+    texte = unicodedata.normalize("NFKD", str(texte))
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", texte.lower()).split())
+
+
+def code_territoire(nom, echelon):
+    """Identifiant d'un territoire tiré de son échelon et de son nom normalisés :
+    « region-ile-de-france », « ville-75056-paris » (le nom des villes commence
+    par leur code INSEE). Le fichier n'a pas de code officiel pour les autres
+    échelons, et le numéro de ligne change dès qu'il est retrié"""
+    return "-".join(f"{normaliser(echelon)} {normaliser(nom)}".split())
+
+
+def charger_territoires(path="naissance_echelons_clean.csv"):
+    """Index des territoires par code_territoire. La colonne cle contient le nom
+    normalisé précédé d'une espace, pour chercher un début de mot avec un simple
+    contains"""
+
+    territoires = pd.read_csv(path, index_col=0)
+    territoires.index = pd.Index(
+        [
+            code_territoire(nom, echelon)
+            for nom, echelon in zip(
+                territoires["Nom de l'échelon"], territoires["Echelon"]
+            )
+        ],
+        name="id",
+    )
+    if not territoires.index.is_unique:
+        doublons = territoires.index[territoires.index.duplicated()].tolist()
+        raise ValueError(f"Territoires en double dans {path} : {doublons}")
+    territoires["cle"] = " " + territoires["Nom de l'échelon"].map(normaliser)
+    return territoires
+
+
+def rechercher(territoires, requete=None, echelons=None, limite=LIMITE_OPTIONS):
+    """Territoires dont le nom commence par la requête, puis ceux dont un mot
+    commence par la requête, sans tenir compte des accents ni de la casse.
+    echelons : liste d'échelons (Pays, Région...) pour filtrer, tous si vide"""
+
+    if echelons:
+        territoires = territoires[territoires["Echelon"].isin(echelons)]
+
+    requete = normaliser(requete or "")
+    if not requete:
+        return territoires.head(limite)
+
+    debut_nom = territoires["cle"].str.startswith(" " + requete)
+    debut_mot = territoires["cle"].str.contains(" " + requete, regex=False)
+
+    return pd.concat(
+        [territoires[debut_nom], territoires[debut_mot & ~debut_nom]]
+    ).head(limite)
+
+
+def options_dropdown(territoires):
+    """Options de dcc.Dropdown : le libellé précise l'échelon, la valeur est l'id"""
+    return [
+        {"label": f"{nom} ({echelon})", "value": id_territoire}
+        for id_territoire, nom, echelon in zip(
+            territoires.index, territoires["Nom de l'échelon"], territoires["Echelon"]
+        )
+    ]
+
+
+def naissances_par_id(territoires):
+    """Nombre de naissances de chaque territoire, pour le callback client"""
+    return {
+        id_territoire: naissances
+        for id_territoire, naissances in zip(
+            territoires.index, territoires["Nombre de naissances (2018)"]
+        )
+    }
+
+
+def couts_territoires(territoires, params, positions=None, salaires_territoriaux=True):
+    """Coût total, par maladie et par secteur de tous les territoires pour un jeu de
+    paramètres, en une seule évaluation vectorisée du modèle par naissance, multipliée
+    ensuite par la colonne des naissances.
+
+    salaires_territoriaux : les pertes de productivité utilisent le salaire horaire des
+    femmes de chaque territoire, comme l'application pour le territoire choisi ;
+    sinon le revenu national de params pour tous"""
+
+    if positions is None:
+        positions = default_positions()
+
+    if salaires_territoriaux:
+        salaires = territoires["Salaire horaire des femmes"].to_numpy(dtype=np.float64)
+        params = params_territoriaux(params, salaires, positions)
+    else:
+        revenu_national = np.asarray(params, dtype=np.float64)[
+            positions[INDICES_VARIABLES["revenu_horaire_femme"]]
+        ]
+        salaires = np.full(len(territoires), revenu_national, dtype=np.float64)
+
+    couts, repartition = process_values_batch(params, positions)
+    par_naissance = couts[..., 2] * prevalences_params(
+        np.atleast_2d(params), positions
+    )
+    total_par_naissance = par_naissance.sum(axis=-1, keepdims=True)
+
+    naissances = territoires["Nombre de naissances (2018)"].to_numpy()
+    colonnes = ["Coût total"] + MALADIES + SECTEURS_TEXTE
+    valeurs = naissances[:, None] * np.concatenate(
+        [total_par_naissance, par_naissance, repartition * total_par_naissance], axis=1
+    )
+
+    resultat = territoires[
+        [
+            "Nom de l'échelon",
+            "Echelon",
+            "Nombre de naissances (2018)",
+            "Salaire horaire des femmes",
+        ]
+    ]
+    resultat = resultat.assign(**{"Salaire horaire retenu": salaires})
+    return pd.concat(
+        [resultat, pd.DataFrame(valeurs, index=territoires.index, columns=colonnes)],
+        axis=1,
+    )
+
+
+def exporter(df, path):
+    """Écrit en Parquet si l'extension est .parquet (pyarrow requis), en CSV sinon"""
+    if str(path).endswith(".parquet"):
+        # même message que batch.py si pyarrow manque ou est trop ancien ; import
+        # différé pour ne pas charger batch.py avec l'application
+        from batch import _parquet
+
+        _parquet()
+        df.to_parquet(path, engine="pyarrow")
+    else:
+        df.to_csv(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Coûts de tous les territoires pour un jeu de paramètres"
+    )
+    parser.add_argument("output", help="fichier .csv ou .parquet")
+    parser.add_argument("--variables", default="bdd_variables.csv")
+    parser.add_argument("--territoires", default="naissance_echelons_clean.csv")
+    parser.add_argument(
+        "--salaire-national",
+        action="store_true",
+        help="revenu horaire de bdd_variables.csv pour tous les territoires",
+    )
+    args = parser.parse_args()
+
+    df_variables = pd.read_csv(args.variables)
+    exporter(
+        couts_territoires(
+            charger_territoires(args.territoires),
+            params_from_df(df_variables),
+            compile_model(df_variables),
+            salaires_territoriaux=not args.salaire_national,
+        ),
+        args.output,
+    )
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+@pytest.fixture(autouse=True)
+def dossier_racine(monkeypatch):
+    """Les modules lisent bdd_variables.csv et les autres fichiers par chemin relatif"""
+    monkeypatch.chdir(RACINE)
+
+
+@pytest.fixture
+def df_variables():
+    return pd.read_csv("bdd_variables.csv")
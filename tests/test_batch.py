@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from batch import run_batch
+from model import VARIABLES, compile_model, evaluer, params_from_df
+
+
+def total_attendu(df_variables, **valeurs):
+    """Coût total par naissance de référence, certaines variables remplacées"""
+    params = params_from_df(df_variables).copy()
+    noms = list(df_variables["nom_variable"])
+    for alias, valeur in valeurs.items():
+        params[noms.index(VARIABLES[alias])] = valeur
+    return evaluer(params, compile_model(df_variables)).total_par_naissance
+
+
+def test_scenarios_jsonl_creux(df_variables, tmp_path):
+    entree, sortie = tmp_path / "scenarios.jsonl", tmp_path / "resultats.csv"
+    entree.write_text(
+        '{"scenario": "a", "prix_vie": 5}\n'
+        '{"scenario": "b", "valeur_qaly": 40000}\n'
+        '{"scenario": "c"}\n',
+        encoding="utf-8",
+    )
+
+    assert run_batch(df_variables, str(entree), str(sortie), n_jobs=1) == 3
+
+    resultats = pd.read_csv(sortie).set_index("scenario")
+    assert not resultats.isna().any().any()
+    attendus = [
+        total_attendu(df_variables, prix_vie=5),
+        total_attendu(df_variables, valeur_qaly=40_000),
+        total_attendu(df_variables),
+    ]
+    np.testing.assert_allclose(
+        resultats.loc[["a", "b", "c"], "Coût total par naissance"], attendus
+    )
+
+
+def test_scenarios_csv_cellules_vides(df_variables, tmp_path):
+    entree, sortie = tmp_path / "scenarios.csv", tmp_path / "resultats.csv"
+    entree.write_text(
+        "scenario,prix_vie,valeur_qaly\na,5,\nb,,40000\nc,,\n", encoding="utf-8"
+    )
+
+    run_batch(df_variables, str(entree), str(sortie), n_jobs=1)
+
+    resultats = pd.read_csv(sortie).set_index("scenario")
+    assert not resultats.isna().any().any()
+    np.testing.assert_allclose(
+        resultats.loc[["a", "b", "c"], "Coût total par naissance"],
+        [
+            total_attendu(df_variables, prix_vie=5),
+            total_attendu(df_variables, valeur_qaly=40_000),
+            total_attendu(df_variables),
+        ],
+    )
+
+
+def test_scenarios_json_tableau(df_variables, tmp_path):
+    entree, sortie = tmp_path / "scenarios.json", tmp_path / "resultats.jsonl"
+    entree.write_text(
+        '[{"scenario": "a", "prix_vie": 5}, {"scenario": "b"}]', encoding="utf-8"
+    )
+
+    n = run_batch(df_variables, str(entree), str(sortie), chunk_size=1, n_jobs=1)
+    assert n == 2
+
+    resultats = pd.read_json(sortie, lines=True).set_index("scenario")
+    np.testing.assert_allclose(
+        resultats.loc[["a", "b"], "Coût total par naissance"],
+        [total_attendu(df_variables, prix_vie=5), total_attendu(df_variables)],
+    )
@@ -0,0 +1,45 @@
+from cache import CacheEnCouches, LRUCache, SQLiteCache
+
+
+def test_sqlite_version(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ancien = SQLiteCache(path, version="a")
+    ancien.set("cle", 1)
+
+    assert SQLiteCache(path, version="a").get("cle") == 1
+    # un autre modèle ne relit pas les résultats de l'ancien
+    nouveau = SQLiteCache(path, version="b")
+    assert nouveau.get("cle") is None
+    nouveau.set("cle", 2)
+    assert nouveau.get_many(["cle"]) == {"cle": 2}
+    assert ancien.get("cle") == 1
+
+
+def test_sqlite_lecture_sans_ecriture(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    for cle in ["a", "b", "c"]:
+        cache.set(cle, cle)
+    connexion = cache._connexion()
+    ecritures = connexion.total_changes
+
+    assert cache.get("a") == "a"
+    assert connexion.total_changes == ecritures
+
+    # la date d'accès du hit compte pour l'éviction : b est la plus ancienne
+    cache.maxsize = 2
+    cache.evincer()
+    assert cache.get_many(["a", "b", "c"]).keys() == {"a", "c"}
+
+
+def test_couches_clear_locale(tmp_path):
+    partage = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache = CacheEnCouches(LRUCache(), partage)
+    cache.set("cle", 1)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert "cle" in partage
+    assert cache.get("cle") == 1
+
+    cache.clear(toutes=True)
+    assert "cle" not in partage
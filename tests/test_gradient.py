@@ -0,0 +1,39 @@
+import numpy as np
+
+from gradient import Dual, gradient
+from model import compile_model, params_from_df
+
+
+def test_gradient_differences_finies(df_variables):
+    """Gradient en mode direct égal aux différences finies centrées au point de
+    référence (valeurs de bdd_variables.csv)"""
+    params, positions = params_from_df(df_variables), compile_model(df_variables)
+
+    total, derivees, _ = gradient(params, positions)
+
+    differences = np.zeros_like(params)
+    for i, valeur in enumerate(params):
+        pas = 1e-5 * max(abs(valeur), 1)
+        plus, moins = params.copy(), params.copy()
+        plus[i] += pas
+        moins[i] -= pas
+        differences[i] = (
+            gradient(plus, positions)[0] - gradient(moins, positions)[0]
+        ) / (2 * pas)
+
+    assert np.count_nonzero(derivees) > 0
+    np.testing.assert_allclose(derivees, differences, rtol=1e-5, atol=1e-9 * total)
+
+
+def test_derivees_secondes_quadratique():
+    """Quadratique plus un quotient (pour la division des duaux) :
+    f(x, y) = 3x² + 2xy - y / x + 7 en (2, 5), f' = (6x + 2y + y/x², 2x - 1/x) et
+    diagonale de la hessienne (6 - 2y/x³, 0)"""
+    x = Dual(2.0, np.array([1.0, 0.0]), np.zeros(2))
+    y = Dual(5.0, np.array([0.0, 1.0]), np.zeros(2))
+
+    f = 3 * x * x + 2 * x * y - y / x + 7
+
+    assert f.val == 3 * 4 + 2 * 10 - 2.5 + 7
+    np.testing.assert_allclose(f.d1, [12 + 10 + 5 / 4, 4 - 1 / 2])
+    np.testing.assert_allclose(f.d2, [6 - 2 * 5 / 8, 0])
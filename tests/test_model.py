@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from model import VARIABLES, ModeleIncremental, compile_model, evaluer, params_from_df
+from model import evaluer_lot, get_revenu_moyen_femme, process_values
+from model import process_values_sensi
+
+
+def test_balayer_egal_evaluer(df_variables):
+    params, positions = params_from_df(df_variables), compile_model(df_variables)
+    j = list(df_variables["nom_variable"]).index(VARIABLES["prix_vie"])
+    valeurs = np.linspace(0, 10, 5)
+
+    balayage = ModeleIncremental(params, positions).balayer("prix_vie", valeurs)
+
+    for i, valeur in enumerate(valeurs):
+        x = params.copy()
+        x[j] = valeur
+        resultat = evaluer(x, positions)
+        np.testing.assert_array_equal(balayage.par_cas[i], resultat.par_cas)
+        np.testing.assert_allclose(balayage.repartition[i], resultat.repartition)
+
+
+def test_couts_nuls_parts_nulles(df_variables):
+    params = df_variables["mini"].to_numpy(dtype=np.float64)
+    positions = compile_model(df_variables)
+
+    with np.errstate(all="raise"):
+        resultat = evaluer(params, positions)
+        nuls, central = evaluer_lot(
+            np.stack([params, params_from_df(df_variables)]), positions
+        )
+
+    assert resultat.total_par_naissance == 0
+    np.testing.assert_array_equal(resultat.repartition, [0, 0, 0])
+    np.testing.assert_array_equal(nuls.repartition, [0, 0, 0])
+    np.testing.assert_array_equal(nuls.par_naissance, np.zeros((3, 3)))
+    assert central.repartition.sum() == pytest.approx(1, abs=1e-3)
+    np.testing.assert_allclose(
+        central.par_naissance,
+        evaluer(params_from_df(df_variables), positions).par_naissance,
+        rtol=1e-12,
+    )
+
+
+def test_get_revenu_moyen_femme(df_variables):
+    revenu = get_revenu_moyen_femme(df_variables)
+    assert revenu == get_revenu_moyen_femme(df_variables.set_index("nom_variable"))
+    assert revenu == pytest.approx(13 * 35 * 0.74 * 0.75 * 0.60)
+
+
+def test_evaluer_refuse_une_matrice(df_variables):
+    with pytest.raises(ValueError, match="evaluer_lot"):
+        evaluer(np.stack([params_from_df(df_variables)] * 2))
+
+
+def _cas_reference():
+    with open(os.path.join("tests", "donnees", "reference_modele.json")) as f:
+        return json.load(f)["cas"]
+
+
+@pytest.mark.parametrize("cas", _cas_reference(), ids=lambda cas: cas["nom"])
+def test_reference(df_variables, cas):
+    """Sorties de l'implémentation d'origine (scalaire, une variable à la fois)
+    enregistrées aux valeurs val, mini, maxi et en 5 points tirés entre mini et maxi.
+    À mini tous les coûts sont nuls : l'ancienne répartition valait 0 / 0, elle vaut
+    désormais 0 (null dans le fichier)"""
+    df_variables["upd_variables"] = cas["valeurs"]
+
+    df_par_cas, df_repartition = process_values(df_variables)
+
+    np.testing.assert_array_equal(df_par_cas.to_numpy(), cas["par_cas"])
+    repartition = [0.0 if part is None else part for part in cas["repartition"]]
+    np.testing.assert_allclose(
+        df_repartition.iloc[:, 0].to_numpy(), repartition, rtol=1e-12, atol=0
+    )
+    assert process_values_sensi(df_variables) == pytest.approx(
+        cas["total_par_naissance"], rel=1e-12
+    )
@@ -0,0 +1,18 @@
+from presets import TablePresets
+
+
+def test_fichier_tronque_recalcule(tmp_path, df_variables):
+    """Un fichier à moitié écrit par un autre worker est recalculé, puis réécrit"""
+    path = tmp_path / "presets.pkl"
+
+    complet = TablePresets(df_variables, path=str(path))
+    contenu = path.read_bytes()
+    path.write_bytes(contenu[: len(contenu) // 2])
+
+    relu = TablePresets(df_variables, path=str(path))
+
+    assert relu.noms == complet.noms
+    for cle in complet.noms:
+        assert relu.get(cle).total_par_naissance == complet.get(cle).total_par_naissance
+    assert path.read_bytes() == contenu
+    assert [f.name for f in tmp_path.iterdir()] == ["presets.pkl"]
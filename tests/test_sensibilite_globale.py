@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sensibilite_globale
+from sensibilite_globale import morris_indices, sobol_indices
+
+
+def ishigami(X, positions=None):
+    return (
+        np.sin(X[:, 0])
+        + 7 * np.sin(X[:, 1]) ** 2
+        + 0.1 * X[:, 2] ** 4 * np.sin(X[:, 0])
+    )
+
+
+@pytest.fixture
+def modele_analytique(monkeypatch):
+    """Remplace le modèle de coûts par une fonction donnée, avec une table de
+    variables au format de bdd_variables.csv"""
+
+    def remplacer(fonction, mini, maxi):
+        monkeypatch.setattr(sensibilite_globale, "process_values_sensi_batch", fonction)
+        monkeypatch.setattr(sensibilite_globale, "compile_model", lambda df: None)
+        return pd.DataFrame(
+            {
+                "nom_variable": [f"x{i + 1}" for i in range(len(mini))],
+                "mini": mini,
+                "maxi": maxi,
+                "category": "analytique",
+            }
+        )
+
+    return remplacer
+
+
+def test_sobol_ishigami(modele_analytique):
+    """Indices connus de la fonction d'Ishigami (a = 7, b = 0.1) sur [-pi, pi]^3"""
+    df_variables = modele_analytique(ishigami, [-np.pi] * 3, [np.pi] * 3)
+
+    indices = sobol_indices(df_variables, n=20_000, seed=0).loc[["x1", "x2", "x3"]]
+
+    np.testing.assert_allclose(
+        indices["Indice de premier ordre"], [0.3139, 0.4424, 0.0], atol=0.03
+    )
+    np.testing.assert_allclose(
+        indices["Indice total"], [0.5576, 0.4424, 0.2437], atol=0.03
+    )
+
+
+def test_morris_lineaire(modele_analytique):
+    """Pour f = a . x, chaque effet élémentaire vaut a_i (maxi - mini)"""
+    a = np.array([3.0, -2.0, 0.5, 0.0])
+    mini, maxi = np.array([0.0, 10, -1, 5]), np.array([1.0, 20, 1, 6])
+    df_variables = modele_analytique(lambda X, positions=None: X @ a, mini, maxi)
+
+    indices = morris_indices(df_variables, r=20, seed=0).loc[["x1", "x2", "x3", "x4"]]
+
+    np.testing.assert_allclose(indices["mu"], a * (maxi - mini), atol=1e-9)
+    np.testing.assert_allclose(indices["mu*"], np.abs(a) * (maxi - mini), atol=1e-9)
+    np.testing.assert_allclose(indices["sigma"], 0, atol=1e-9)
+
+
+def test_morris_classement_stable(df_variables):
+    """Même graine, mêmes indices ; les variables dominantes du modèle sont les mêmes
+    quelle que soit la graine"""
+    indices = morris_indices(df_variables, r=100, seed=0)
+    pd.testing.assert_frame_equal(indices, morris_indices(df_variables, r=100, seed=0))
+
+    dominantes = set(indices.index[:4])
+    assert dominantes == {
+        "Prévalence de la dépression",
+        "Valeur d'une année de QALY",
+        "Durée moyenne d'une dépréssion périnatale",
+        "Indice de perte de qualité de vie pour la dépression",
+    }
+    for seed in range(1, 5):
+        autre = morris_indices(df_variables, r=100, seed=seed)
+        assert set(autre.index[:4]) == dominantes
@@ -0,0 +1,47 @@
+import numpy as np
+
+from statistiques import MomentsCourants, SketchQuantiles
+
+
+def test_moments_fusionnes_par_paquets():
+    rng = np.random.default_rng(0)
+    paquets = [
+        rng.normal(loc=1e4, scale=50 * (i + 1), size=(taille, 3))
+        for i, taille in enumerate([1, 17, 0, 250, 1000, 2])
+    ]
+
+    moments = MomentsCourants(3)
+    for paquet in paquets:
+        moments.ajouter(paquet)
+
+    donnees = np.concatenate(paquets)
+    assert moments.n == len(donnees)
+    np.testing.assert_allclose(moments.moyenne, np.mean(donnees, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(
+        moments.variance, np.var(donnees, axis=0, ddof=1), rtol=1e-10
+    )
+
+
+def test_quantiles_a_la_precision_pres():
+    """Paquets d'étendues différentes (la plage de seaux s'agrandit des deux côtés)
+    et quelques zéros. Le sketch renvoie la valeur de rang floor(q (n - 1)), comme
+    np.quantile sans interpolation : dans les queues, deux valeurs voisines peuvent
+    être plus éloignées que la précision"""
+    rng = np.random.default_rng(1)
+    paquets = [
+        rng.lognormal(mean=9, sigma=0.5, size=20_000),
+        rng.lognormal(mean=7, sigma=1.5, size=20_000),
+        rng.lognormal(mean=11, sigma=1.0, size=20_000),
+        np.zeros(500),
+    ]
+
+    sketch = SketchQuantiles(precision=0.01)
+    for paquet in paquets:
+        sketch.ajouter(paquet)
+
+    q = np.array([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999])
+    donnees = np.sort(np.concatenate(paquets))
+    attendus = donnees[np.floor(q * (len(donnees) - 1)).astype(int)]
+    assert sketch.n == sum(len(paquet) for paquet in paquets)
+    np.testing.assert_allclose(sketch.quantiles(q), attendus, rtol=sketch.precision)
+    np.testing.assert_array_equal(sketch.quantiles([0.0, 0.004]), [0, 0])
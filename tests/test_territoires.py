@@ -0,0 +1,79 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import CODES_MALADIES, INDICES_VARIABLES, MALADIES, compile_model, evaluer
+from model import params_from_df, process_values_sensi
+from territoires import ID_FRANCE, charger_territoires, couts_territoires, exporter
+from territoires import rechercher
+
+
+@pytest.fixture
+def territoires():
+    return charger_territoires("naissance_echelons_clean.csv")
+
+
+def test_export_salaire_de_chaque_territoire(territoires, df_variables):
+    """Chaque ligne de l'export vaut process_values_sensi avec le salaire horaire des
+    femmes du territoire, multiplié par ses naissances"""
+    params, positions = params_from_df(df_variables), compile_model(df_variables)
+    ligne_revenu = positions[INDICES_VARIABLES["revenu_horaire_femme"]]
+
+    echantillon = territoires.groupby("Echelon").head(5)
+    export = couts_territoires(echantillon, params, positions)
+
+    np.testing.assert_array_equal(
+        export["Salaire horaire retenu"], echantillon["Salaire horaire des femmes"]
+    )
+    for id_territoire, territoire in echantillon.iterrows():
+        variables = df_variables.copy()
+        variables.iloc[ligne_revenu, -1] = territoire["Salaire horaire des femmes"]
+        naissances = territoire["Nombre de naissances (2018)"]
+
+        attendus = [process_values_sensi(variables)] + [
+            process_values_sensi(variables, **dict(zip(CODES_MALADIES, actives)))
+            for actives in np.eye(3, dtype=bool).tolist()
+        ]
+        np.testing.assert_allclose(
+            export.loc[id_territoire, ["Coût total"] + MALADIES].astype(float),
+            naissances * np.array(attendus),
+            rtol=1e-12,
+        )
+
+
+def test_export_salaire_national(territoires, df_variables):
+    """Avec salaires_territoriaux=False, le revenu national de params sert partout"""
+    params, positions = params_from_df(df_variables), compile_model(df_variables)
+
+    export = couts_territoires(
+        territoires, params, positions, salaires_territoriaux=False
+    )
+
+    par_naissance = evaluer(params, positions).total_par_naissance
+    naissances = territoires["Nombre de naissances (2018)"]
+    np.testing.assert_allclose(export["Coût total"], naissances * par_naissance)
+
+
+def test_code_stable_au_tri(tmp_path, territoires):
+    melange = pd.read_csv("naissance_echelons_clean.csv", index_col=0).sample(
+        frac=1, random_state=0
+    )
+    melange.to_csv(tmp_path / "territoires.csv")
+
+    relus = charger_territoires(str(tmp_path / "territoires.csv"))
+
+    assert territoires.loc[ID_FRANCE, "Echelon"] == "Pays"
+    pd.testing.assert_frame_equal(relus.loc[territoires.index], territoires)
+
+
+def test_recherche_sans_accents(territoires):
+    resultats = rechercher(territoires, "ile de")
+    assert "region-ile-de-france" in resultats.index
+
+
+def test_export_parquet_sans_pyarrow(monkeypatch, tmp_path, territoires):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match="pyarrow >= 3.0 est requis"):
+        exporter(territoires, tmp_path / "territoires.parquet")
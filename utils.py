@@ -6,12 +6,14 @@ import dash
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
-import plotly.express as px
-import plotly.graph_objs as go
 
+from functools import lru_cache
 from itertools import chain
 from dash.dependencies import Input, Output, State
 
+from territoires import ECHELONS, ID_FRANCE, naissances_par_id, options_dropdown
+from territoires import rechercher
+
 
 # CSS SETTINGS
 eq_width = {"width": "20%", "text-align": "center"}
@@ -20,6 +22,8 @@ tt = {"always_visible": False, "placement": "topLeft"}
 # VARIABLES
 global df_variables
 df_variables = pd.read_csv("bdd_variables.csv")
+# nom de variable -> index de sa ligne, qui identifie son slider et son popover
+index_variables = dict(zip(df_variables["nom_variable"], df_variables.index))
 
 def marker(num):
     return int(num) if num % 1 == 0 else num
@@ -32,7 +36,7 @@ def generate_item(df_variables, category):
     df_categ = df_variables[df_variables["category"] == category]
 
     dict_items = {
-        row["nom_variable"]: [
+        row.nom_variable: [
             html.Div(
                 [
                     dcc.Slider(
@@ -52,14 +56,14 @@ def generate_item(df_variables, category):
                                 "label": "{}\xa0{}".format(round(row.maxi, 2), row.unit)
                             },
                         },
-                        id=f"slider-{idx}",
+                        id={"type": "slider", "index": row.Index},
                     ),
                 ],
                 style={"padding": "0 1em 0 1em"},
-                hidden=bool(row["nom_variable"] == "Nombre de naissances"),
+                hidden=bool(row.nom_variable == "Nombre de naissances"),
             )
         ]
-        for idx, row in df_categ.iterrows()
+        for row in df_categ.itertuples()
     }
 
     return dict_items
@@ -80,7 +84,7 @@ def make_group(title, items, item_name):
             className="ml-1",
             size="sm",
             style={"float": "right"},
-            id=f"open-tab-{item_name}",
+            id={"type": "open-tab", "index": item_name},
         )
 
     card_header = dbc.CardHeader(
@@ -109,7 +113,7 @@ def make_group(title, items, item_name):
         card_content = [
             dbc.Collapse(
                 card_content,
-                id=f"collapsible-{item_name}",
+                id={"type": "collapsible", "index": item_name},
                 style={"padding": "0 0 1em 0"},
             )
         ]
@@ -117,42 +121,60 @@ def make_group(title, items, item_name):
     return dbc.Card([card_header] + card_content, color="dark", outline=True,)
 
 
+def make_question_mark(index):
+    """Badge "?" cible d'un popover. Le badge garde un id texte pour servir de cible
+    au popover ; le clic est capté par le Span, dont l'id suit le motif des callbacks"""
+    return html.Span(
+        dbc.Badge("?", pill=True, color="light", id=f"badge-{index}"),
+        id={"type": "question-mark", "index": index},
+    )
+
+
 def generate_qm(item):
-    id_hash = df_variables[df_variables["nom_variable"] == item].index.values[0]
-    question_mark = dbc.Badge("?", pill=True, color="light", id="badge-" + str(id_hash))
+    id_hash = int(index_variables[item])
+    question_mark = make_question_mark(id_hash)
 
     return dbc.Col(question_mark, width=1, style={"padding": "5px"})
 
 
 def generate_popovers():
-    popovers = list()
-    for i in range(df_variables.shape[0]):
-        pp = dbc.Popover(
-            [
-                dbc.PopoverHeader(df_variables.iloc[i, :]["nom_variable"]),
-                dbc.PopoverBody(df_variables.iloc[i, :]["explication"]),
-            ],
-            id=f"popover-{i}",
+    return [
+        dbc.Popover(
+            [dbc.PopoverHeader(nom), dbc.PopoverBody(explication)],
+            id={"type": "popover", "index": i},
             target=f"badge-{i}",
             is_open=False,
         )
-        popovers.append(pp)
-    return popovers
+        for i, (nom, explication) in enumerate(
+            zip(df_variables["nom_variable"], df_variables["explication"])
+        )
+    ]
 
 
-def make_row(it):
-    return dbc.Row([dbc.Col(html.Label(it)), dbc.Col(question_mark)])
+@lru_cache(maxsize=None)
+def encoded_card_image(image_filename="card_image_transparent.png"):
+    """Image de la carte encodée en base64, lue une seule fois sur le disque"""
+    with open(image_filename, "rb") as f:
+        return base64.b64encode(f.read()).decode()
 
 
-def make_card_repartition(df_par_naissance):
+def proportions_mere_bebe(df_par_naissance):
+    """Parts des coûts liées à la mère et au bébé, formatées pour la carte"""
 
     total_mere = df_par_naissance["Mère"].sum()
     total_bebe = df_par_naissance["Bébé"].sum()
 
+    if total_mere + total_bebe == 0:
+        return f"{0: .0f} %", f"{0: .0f} %"
+
     proportion_mere = 100 * total_mere / (total_mere + total_bebe)
 
-    image_filename = "card_image_transparent.png"
-    encoded_image = base64.b64encode(open(image_filename, "rb").read())
+    return f"{proportion_mere: .0f} %", f"{100 - proportion_mere: .0f} %"
+
+
+def make_card_repartition():
+    """Carte construite une seule fois : le callback ne met à jour que les
+    pourcentages (proportion-mere et proportion-bebe)"""
 
     card = html.Div(
         [
@@ -162,7 +184,7 @@ def make_card_repartition(df_par_naissance):
                         [
                             html.Img(
                                 src="data:image/png;base64,{}".format(
-                                    encoded_image.decode()
+                                    encoded_card_image()
                                 ),
                                 alt="Mère et bébé",
                                 width=130,
@@ -173,12 +195,12 @@ def make_card_repartition(df_par_naissance):
                     dbc.Col(
                         [
                             html.H1(
-                                f"{proportion_mere: .0f} %",
+                                id="proportion-mere",
                                 style={"color": "#1b75bc", "font-weight": "bold",},
                             ),
                             html.P("de ces coûts sont liés à la mère"),
                             html.H1(
-                                f"{100 - proportion_mere: .0f} %",
+                                id="proportion-bebe",
                                 style={
                                     "color": "#8ec63f",
                                     "font-weight": "bold",
@@ -211,7 +233,15 @@ def millify(n):
     return "{:.1f}{}".format(n / 10 ** (3 * millidx), millnames[millidx])
 
 
-def generate_form_naissances(bdd_naissances):
+def generate_form_naissances(territoires):
+    """Formulaire de choix du territoire. Seules les premières options sont envoyées
+    avec la page, les autres sont fournies par le callback de recherche.
+    La recherche a son propre champ : le filtre de dcc.Dropdown, sensible aux
+    accents, masquerait des territoires trouvés par le serveur (« ile de » pour
+    Île-de-France), le menu ne fait donc que proposer les résultats"""
+
+    options_initiales = rechercher(territoires)
+
     form = dbc.Form(
         [
             dbc.Col(
@@ -230,16 +260,27 @@ def generate_form_naissances(bdd_naissances):
             ),
             dbc.Col(
                 [
+                    dcc.Input(
+                        id="recherche-territoire",
+                        type="search",
+                        placeholder="Rechercher un territoire",
+                        style={"width": "100%"},
+                    ),
                     dcc.Dropdown(
-                        value=756662,
+                        value=ID_FRANCE,
                         id="dd-echelle",
-                        options=[
-                            {
-                                "label": r["Nom de l'échelon"],
-                                "value": r["Nombre de naissances (2018)"],
-                            }
-                            for _, r in bdd_naissances.iterrows()
-                        ],
+                        options=options_dropdown(options_initiales),
+                        searchable=False,
+                    ),
+                    dcc.Dropdown(
+                        id="dd-type-echelon",
+                        options=[{"label": e, "value": e} for e in ECHELONS],
+                        multi=True,
+                        placeholder="Tous les échelons",
+                    ),
+                    dcc.Store(
+                        id="store-naissances-options",
+                        data=naissances_par_id(options_initiales),
                     ),
                 ],
                 width=4,